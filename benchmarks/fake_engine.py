@@ -0,0 +1,506 @@
+"""
+A stand-in for the Docker Engine API, serving a synthetic inventory of N
+containers, images, networks and volumes over HTTP, for benchmarking.
+
+It implements the read endpoints the server uses (listings, inspections, logs,
+stats and events) plus starting and stopping containers, and running commands
+in them, which print lines of output (or sleep, for `sleep N`). Every request can be
+delayed by a fixed latency, to model a remote daemon, and is counted by
+endpoint so that benchmarks can report the Docker API calls a tool makes.
+"""
+
+import json
+import re
+import struct
+import threading
+import time
+from collections import Counter
+from collections.abc import Callable, Iterator
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any
+from urllib.parse import parse_qs, urlparse
+
+PROJECT_LABEL = "mcp-server-docker.project"
+API_VERSION = "1.41"
+
+# Collapses object IDs and names in request paths, to count calls by endpoint
+_ID_PATTERN = re.compile(r"/(containers|images|networks|volumes|exec)/(?!json$)[^/]+")
+_LOG_LINES = 200
+
+
+def _container(i: int, image_id: str, network: str) -> dict[str, Any]:
+    """The inspection of the i-th container."""
+    labels = {"app": f"app{i % 10}"}
+    # A tenth of the containers make up a project, for the docker_compose prompt
+    if i % 10 == 0:
+        labels[PROJECT_LABEL] = "bench"
+    running = i % 4 != 3
+    return {
+        "Id": f"{i + 1:064x}",
+        "Name": f"/container-{i}",
+        "Created": "2024-01-01T00:00:00.000000000Z",
+        "Path": "sleep",
+        "Args": ["infinity"],
+        "State": {
+            "Status": "running" if running else "exited",
+            "Running": running,
+            "ExitCode": 0,
+            "StartedAt": "2024-01-01T00:00:01.000000000Z",
+        },
+        "Image": image_id,
+        "RestartCount": 0,
+        "HostConfig": {
+            "NetworkMode": network,
+            "PortBindings": {"80/tcp": [{"HostIp": "", "HostPort": str(8000 + i)}]},
+            "Binds": [f"volume-{i % 50}:/data:rw"],
+        },
+        "Config": {
+            "Hostname": f"{i + 1:012x}",
+            "Image": f"image-{i % 100}:latest",
+            "Env": ["PATH=/usr/local/bin:/usr/bin:/bin", f"INDEX={i}"],
+            "Cmd": ["sleep", "infinity"],
+            "Labels": labels,
+            "Tty": False,
+        },
+        "NetworkSettings": {
+            "Ports": {"80/tcp": [{"HostIp": "0.0.0.0", "HostPort": str(8000 + i)}]},
+            "Networks": {
+                network: {"IPAddress": f"10.0.{i // 250 % 256}.{i % 250 + 2}"}
+            },
+        },
+        "Mounts": [
+            {
+                "Type": "volume",
+                "Name": f"volume-{i % 50}",
+                "Destination": "/data",
+                "RW": True,
+            }
+        ],
+    }
+
+
+def _container_summary(container: dict[str, Any]) -> dict[str, Any]:
+    """The entry of a container in the list endpoint."""
+    return {
+        "Id": container["Id"],
+        "Names": [container["Name"]],
+        "Image": container["Config"]["Image"],
+        "ImageID": container["Image"],
+        "Command": "sleep infinity",
+        "Created": 1704067200,
+        "State": container["State"]["Status"],
+        "Status": "Up 2 hours" if container["State"]["Running"] else "Exited (0)",
+        "Ports": [{"PrivatePort": 80, "PublicPort": 8000, "Type": "tcp"}],
+        "Labels": container["Config"]["Labels"],
+        "NetworkSettings": {"Networks": container["NetworkSettings"]["Networks"]},
+        "Mounts": container["Mounts"],
+    }
+
+
+def _image(i: int) -> dict[str, Any]:
+    """The inspection of the i-th image."""
+    return {
+        "Id": f"sha256:{i:064x}",
+        "RepoTags": [f"image-{i}:latest"],
+        "RepoDigests": [],
+        "Created": "2024-01-01T00:00:00.000000000Z",
+        "Size": 50_000_000 + i,
+        "Config": {"Cmd": ["sh"], "Env": [], "Labels": {"org.example.index": str(i)}},
+    }
+
+
+def _image_summary(image: dict[str, Any]) -> dict[str, Any]:
+    return {
+        "Id": image["Id"],
+        "ParentId": "",
+        "RepoTags": image["RepoTags"],
+        "RepoDigests": [],
+        "Created": 1704067200,
+        "Size": image["Size"],
+        "Labels": image["Config"]["Labels"],
+        "Containers": -1,
+    }
+
+
+def _labeled(
+    objects: list[dict[str, Any]],
+    labels: list[str],
+    get_labels: Callable[[dict[str, Any]], dict[str, str]],
+) -> list[dict[str, Any]]:
+    """Filter objects by `key` or `key=value` label filters, as the daemon does."""
+    for label in labels:
+        key, _, value = label.partition("=")
+        objects = [
+            obj
+            for obj in objects
+            if key in get_labels(obj) and (not value or get_labels(obj)[key] == value)
+        ]
+    return objects
+
+
+class Inventory:
+    """
+    The synthetic objects of the engine: `size` containers and images, and a
+    tenth as many networks and volumes. Containers share the first 100 images,
+    as many containers run the same few images.
+    """
+
+    def __init__(self, size: int):
+        self.images = [_image(i) for i in range(max(1, size))]
+        self.networks = [
+            {
+                "Name": f"network-{i}",
+                "Id": f"{i + 1:064x}",
+                "Created": "2024-01-01T00:00:00.000000000Z",
+                "Scope": "local",
+                "Driver": "bridge",
+                "Internal": False,
+                "Labels": {PROJECT_LABEL: "bench"} if i == 0 else {},
+            }
+            for i in range(max(1, size // 10))
+        ]
+        self.volumes = [
+            {
+                "Name": f"volume-{i}",
+                "Driver": "local",
+                "Mountpoint": f"/var/lib/docker/volumes/volume-{i}/_data",
+                "CreatedAt": "2024-01-01T00:00:00Z",
+                "Labels": {PROJECT_LABEL: "bench"} if i == 0 else {},
+                "Scope": "local",
+            }
+            for i in range(max(1, size // 10))
+        ]
+        self.containers = [
+            _container(
+                i,
+                self.images[i % 100]["Id"],
+                self.networks[i % len(self.networks)]["Name"],
+            )
+            for i in range(size)
+        ]
+
+        self._containers_by_ref: dict[str, dict[str, Any]] = {}
+        for container in self.containers:
+            self._containers_by_ref[container["Id"]] = container
+            self._containers_by_ref[container["Id"][:12]] = container
+            self._containers_by_ref[container["Name"].lstrip("/")] = container
+        self._images_by_ref: dict[str, dict[str, Any]] = {}
+        for image in self.images:
+            self._images_by_ref[image["Id"]] = image
+            self._images_by_ref[image["Id"][7:]] = image
+            self._images_by_ref[image["RepoTags"][0]] = image
+
+    def container(self, ref: str) -> dict[str, Any] | None:
+        return self._containers_by_ref.get(ref)
+
+    def image(self, ref: str) -> dict[str, Any] | None:
+        return self._images_by_ref.get(ref)
+
+
+class FakeEngine:
+    """
+    Serves an `Inventory` of `size` objects on a local port, in background
+    threads. Each request is delayed by `latency` seconds.
+    """
+
+    def __init__(self, size: int, latency: float = 0.0):
+        self.inventory = Inventory(size)
+        self.latency = latency
+        self.calls: Counter[str] = Counter()
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        # Listings never change, so they're encoded once per query
+        self._listings: dict[str, bytes] = {}
+        self._execs: dict[str, dict[str, Any]] = {}
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._server.daemon_threads = True
+
+    @property
+    def base_url(self) -> str:
+        return f"tcp://127.0.0.1:{self._server.server_address[1]}"
+
+    def start(self) -> "FakeEngine":
+        threading.Thread(
+            target=self._server.serve_forever, name="fake-engine", daemon=True
+        ).start()
+        return self
+
+    def stop(self):
+        self._stopped.set()
+        self._server.shutdown()
+        self._server.server_close()
+
+    def call_count(self) -> int:
+        with self._lock:
+            return sum(self.calls.values())
+
+    def _count(self, method: str, path: str):
+        with self._lock:
+            endpoint = _ID_PATTERN.sub(r"/\1/{id}", path)
+            self.calls[f"{method} {endpoint}"] += 1
+
+    def _handler(self) -> type[BaseHTTPRequestHandler]:
+        engine = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Headers and body are written separately; don't wait on delayed ACKs
+            disable_nagle_algorithm = True
+
+            def log_message(self, format: str, *args: Any):
+                pass
+
+            def do_GET(self):
+                engine._route(self, "GET")
+
+            def do_POST(self):
+                engine._route(self, "POST")
+
+        return Handler
+
+    def _route(self, request: BaseHTTPRequestHandler, method: str):
+        url = urlparse(request.path)
+        path = re.sub(r"^/v[0-9.]+", "", url.path)
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        length = int(request.headers.get("Content-Length") or 0)
+        body = json.loads(request.rfile.read(length)) if length else None
+
+        self._count(method, path)
+        if self.latency:
+            time.sleep(self.latency)
+
+        inventory = self.inventory
+        filters = json.loads(query.get("filters", "{}"))
+        labels = filters.get("label", [])
+        if isinstance(labels, dict):
+            labels = list(labels)
+
+        if path == "/_ping":
+            return _send(request, 200, b"OK", "text/plain")
+        if path == "/version":
+            return _send(request, 200, {"ApiVersion": API_VERSION, "Version": "fake"})
+        if path == "/events":
+            return self._events(request)
+
+        if path == "/containers/json":
+            return self._send_listing(
+                request, lambda: self._list_containers(query, filters, labels)
+            )
+
+        match = re.match(
+            r"^/containers/([^/]+)/(json|logs|stats|start|stop|exec)$", path
+        )
+        if match:
+            container = inventory.container(match.group(1))
+            if container is None:
+                return _send(request, 404, {"message": "No such container"})
+            action = match.group(2)
+            if action == "json":
+                return _send(request, 200, container)
+            if action == "logs":
+                return self._logs(request, query)
+            if action == "stats":
+                return self._stats(request, query)
+            if action == "exec":
+                return self._create_exec(request, container, body)
+            return _send(request, 204)
+
+        match = re.match(r"^/exec/([^/]+)/(start|json)$", path)
+        if match:
+            exec_ = self._execs.get(match.group(1))
+            if exec_ is None:
+                return _send(request, 404, {"message": "No such exec instance"})
+            if match.group(2) == "json":
+                return _send(request, 200, exec_)
+            return self._start_exec(request, exec_)
+
+        if path == "/images/json":
+            return self._send_listing(
+                request,
+                lambda: [
+                    _image_summary(i)
+                    for i in _labeled(
+                        inventory.images, labels, lambda i: i["Config"]["Labels"]
+                    )
+                ],
+            )
+        match = re.match(r"^/images/(.+)/json$", path)
+        if match:
+            image = inventory.image(match.group(1))
+            if image is None:
+                return _send(request, 404, {"message": "No such image"})
+            return _send(request, 200, image)
+
+        if path == "/networks":
+            networks = _labeled(inventory.networks, labels, lambda n: n["Labels"])
+            return _send(request, 200, networks)
+        if path == "/volumes":
+            volumes = _labeled(inventory.volumes, labels, lambda v: v["Labels"])
+            return _send(request, 200, {"Volumes": volumes, "Warnings": []})
+
+        return _send(request, 404, {"message": f"Not implemented: {method} {path}"})
+
+    def _list_containers(
+        self, query: dict[str, str], filters: dict[str, Any], labels: list[str]
+    ) -> list[dict[str, Any]]:
+        containers = self.inventory.containers
+        if query.get("all") not in ("1", "true", "True"):
+            containers = [c for c in containers if c["State"]["Running"]]
+        containers = _labeled(containers, labels, lambda c: c["Config"]["Labels"])
+        for prefix in filters.get("id", []):
+            containers = [c for c in containers if c["Id"].startswith(prefix)]
+        for name in filters.get("name", []):
+            containers = [c for c in containers if name in c["Name"]]
+        limit = int(query.get("limit", -1))
+        if limit > 0:
+            containers = containers[:limit]
+        return [_container_summary(c) for c in containers]
+
+    def _send_listing(
+        self, request: BaseHTTPRequestHandler, build: Callable[[], list[Any]]
+    ):
+        data = self._listings.get(request.path)
+        if data is None:
+            data = self._listings[request.path] = json.dumps(build()).encode()
+        _send(request, 200, data)
+
+    def _logs(self, request: BaseHTTPRequestHandler, query: dict[str, str]):
+        timestamps = query.get("timestamps") in ("1", "true", "True")
+        tail = query.get("tail", "all")
+        count = _LOG_LINES if tail == "all" else min(int(tail), _LOG_LINES)
+        body = bytearray()
+        for i in range(_LOG_LINES - count, _LOG_LINES):
+            line = f"log line {i}: GET /index.html 200\n"
+            if timestamps:
+                line = f"2024-01-01T00:{i // 60:02d}:{i % 60:02d}.000000000Z {line}"
+            data = line.encode()
+            # Multiplexed stdout frame, as for containers without a TTY
+            body += struct.pack(">BxxxL", 1, len(data)) + data
+        _send(request, 200, bytes(body), "application/vnd.docker.multiplexed-stream")
+
+    def _stats(self, request: BaseHTTPRequestHandler, query: dict[str, str]):
+        def sample() -> dict[str, Any]:
+            now = time.time()
+            return {
+                "read": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(now)),
+                "cpu_stats": {
+                    "cpu_usage": {"total_usage": int(now * 1e8)},
+                    "system_cpu_usage": int(now * 1e9),
+                    "online_cpus": 2,
+                },
+                "memory_stats": {"usage": 50_000_000, "limit": 1_000_000_000},
+                "networks": {"eth0": {"rx_bytes": 1000, "tx_bytes": 2000}},
+                "blkio_stats": {"io_service_bytes_recursive": []},
+                "pids_stats": {"current": 3},
+            }
+
+        if query.get("stream") in ("0", "false", "False"):
+            return _send(request, 200, sample())
+
+        # Stream a sample every 100ms, faster than Docker, to keep benchmarks short
+        def samples() -> Iterator[dict[str, Any]]:
+            while True:
+                yield sample()
+                time.sleep(0.1)
+
+        _stream(request, samples(), self._stopped)
+
+    def _create_exec(
+        self,
+        request: BaseHTTPRequestHandler,
+        container: dict[str, Any],
+        config: dict[str, Any],
+    ):
+        if not container["State"]["Running"]:
+            return _send(
+                request, 409, {"message": f"Container {container['Id']} is not running"}
+            )
+        exec_id = f"{len(self._execs) + 1:064x}"
+        self._execs[exec_id] = {
+            "ID": exec_id,
+            "ContainerID": container["Id"],
+            "Running": False,
+            "ExitCode": None,
+            "ProcessConfig": {
+                "entrypoint": config["Cmd"][0],
+                "arguments": config["Cmd"][1:],
+            },
+        }
+        _send(request, 201, {"Id": exec_id})
+
+    def _start_exec(self, request: BaseHTTPRequestHandler, exec_: dict[str, Any]):
+        # The daemon hijacks the connection to send the raw output
+        request.send_response(101, "UPGRADED")
+        request.send_header("Content-Type", "application/vnd.docker.multiplexed-stream")
+        request.send_header("Connection", "Upgrade")
+        request.send_header("Upgrade", "tcp")
+        request.end_headers()
+        request.wfile.flush()
+        request.close_connection = True
+        exec_["Running"] = True
+        # The Docker SDK reads the output from the socket, past the buffer the
+        # headers were read into: give it time to read them, as the daemon does
+        # while starting the command
+        time.sleep(0.01)
+        command = exec_["ProcessConfig"]
+        try:
+            if command["entrypoint"] == "sleep":
+                self._stopped.wait(float(command["arguments"][0]))
+            else:
+                for i in range(_LOG_LINES):
+                    data = f"output line {i}\n".encode()
+                    request.wfile.write(struct.pack(">BxxxL", 1, len(data)) + data)
+                data = b"done\n"
+                request.wfile.write(struct.pack(">BxxxL", 2, len(data)) + data)
+                request.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        exec_.update(Running=False, ExitCode=0)
+
+    def _events(self, request: BaseHTTPRequestHandler):
+        # Nothing changes, so the stream stays silent until the engine stops
+        _stream(request, iter(()), self._stopped)
+
+
+def _send(
+    request: BaseHTTPRequestHandler,
+    status: int,
+    body: Any = None,
+    content_type: str = "application/json",
+):
+    if body is None:
+        data = b""
+    elif isinstance(body, bytes):
+        data = body
+    else:
+        data = json.dumps(body).encode()
+    request.send_response(status)
+    request.send_header("Content-Type", content_type)
+    request.send_header("Content-Length", str(len(data)))
+    request.end_headers()
+    request.wfile.write(data)
+
+
+def _stream(
+    request: BaseHTTPRequestHandler,
+    events: Iterator[dict[str, Any]],
+    stopped: threading.Event,
+):
+    """Send JSON events with chunked encoding until the client goes away or the engine stops."""
+    request.send_response(200)
+    request.send_header("Content-Type", "application/json")
+    request.send_header("Transfer-Encoding", "chunked")
+    request.end_headers()
+    request.close_connection = True
+    try:
+        for event in events:
+            if stopped.is_set():
+                break
+            data = json.dumps(event).encode() + b"\n"
+            request.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+            request.wfile.flush()
+        stopped.wait()
+        # End the stream cleanly, as the daemon does when it shuts down
+        request.wfile.write(b"0\r\n\r\n")
+    except (BrokenPipeError, ConnectionResetError):
+        pass
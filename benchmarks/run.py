@@ -0,0 +1,266 @@
+"""
+Benchmark the server's tools, resources and prompts against a fake Docker
+Engine serving N containers and images, and a tenth as many networks and
+volumes.
+
+For each inventory size and scenario, reports the latency of the first (cold)
+call and the percentiles of the following (warm) calls, along with the Docker
+API calls and response bytes of a call:
+
+    python -m benchmarks.run --sizes 10,1000,10000 --latency 0.001 --json out.json
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import sys
+import time
+from collections.abc import Awaitable, Callable
+from dataclasses import asdict, dataclass
+from typing import Any
+
+import docker
+from mcp.server.lowlevel.server import request_ctx
+from mcp.shared.context import RequestContext
+from pydantic import AnyUrl
+
+from mcp_server_docker import server
+from mcp_server_docker.settings import ServerSettings
+
+from .fake_engine import API_VERSION, FakeEngine
+
+
+class _NullSession:
+    """Stands in for the MCP session of a client, discarding what's sent to it."""
+
+    async def send_log_message(self, *args: Any, **kwargs: Any):
+        pass
+
+    async def send_progress_notification(self, *args: Any, **kwargs: Any):
+        pass
+
+    async def send_resource_updated(self, *args: Any, **kwargs: Any):
+        pass
+
+
+@dataclass
+class Scenario:
+    name: str
+    # Makes one request, returning the response as sent to the client
+    call: Callable[[], Awaitable[str]]
+    # Skipped for larger inventories, where a single call takes too long
+    max_size: int | None = None
+
+
+@dataclass
+class Result:
+    size: int
+    scenario: str
+    cold_ms: float
+    p50_ms: float
+    p90_ms: float
+    p99_ms: float
+    cold_docker_calls: int
+    warm_docker_calls: float
+    response_bytes: int
+
+
+async def _call_tool(name: str, arguments: dict[str, Any]) -> str:
+    content = await server.call_tool(name, arguments)
+    return "".join(c.text for c in content if c.type == "text")
+
+
+async def _list_resources() -> str:
+    # The first page, as clients list resources page by page
+    resources, next_cursor = await server.list_resources()
+    return json.dumps(
+        {
+            "resources": [r.model_dump(mode="json") for r in resources],
+            "nextCursor": next_cursor,
+        }
+    )
+
+
+async def _get_prompt(name: str, arguments: dict[str, str]) -> str:
+    return (await server.get_prompt(name, arguments)).model_dump_json()
+
+
+def scenarios() -> list[Scenario]:
+    container = "container-0"
+    return [
+        Scenario(
+            "list_containers",
+            lambda: _call_tool("list_containers", {"all": True}),
+            1000,
+        ),
+        Scenario(
+            "list_containers (summary)",
+            lambda: _call_tool("list_containers", {"all": True, "detail": "summary"}),
+        ),
+        Scenario(
+            "list_containers (limit 50)",
+            lambda: _call_tool("list_containers", {"all": True, "limit": 50}),
+        ),
+        Scenario("list_images", lambda: _call_tool("list_images", {})),
+        Scenario("list_networks", lambda: _call_tool("list_networks", {})),
+        Scenario("list_volumes", lambda: _call_tool("list_volumes", {})),
+        Scenario(
+            "fetch_container_logs",
+            lambda: _call_tool("fetch_container_logs", {"container_id": container}),
+        ),
+        Scenario(
+            "exec_in_container",
+            lambda: _call_tool(
+                "exec_in_container", {"container_id": container, "command": "ps"}
+            ),
+        ),
+        Scenario("list_resources", _list_resources),
+        Scenario(
+            "read_resource (logs)",
+            lambda: server.read_resource(
+                AnyUrl(f"docker://containers/{container}/logs")
+            ),
+        ),
+        Scenario(
+            "read_resource (inspect)",
+            lambda: server.read_resource(
+                AnyUrl(f"docker://containers/{container}/inspect")
+            ),
+        ),
+        Scenario(
+            "read_resource (image)",
+            lambda: server.read_resource(AnyUrl("docker://images/image-0:latest")),
+        ),
+        Scenario(
+            "read_resource (volume)",
+            lambda: server.read_resource(AnyUrl("docker://volumes/volume-0")),
+        ),
+        Scenario(
+            "read_resource (stats)",
+            lambda: server.read_resource(
+                AnyUrl(f"docker://containers/{container}/stats")
+            ),
+        ),
+        Scenario(
+            "get_prompt",
+            lambda: _get_prompt(
+                "docker_compose", {"name": "bench", "containers": "a web server"}
+            ),
+        ),
+    ]
+
+
+def _percentile(values: list[float], q: float) -> float:
+    """The nearest-rank percentile of `values`."""
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(q * len(ordered)) - 1)]
+
+
+async def _measure(
+    engine: FakeEngine, size: int, scenario: Scenario, repeat: int
+) -> Result:
+    latencies = []
+    calls = []
+    response = ""
+    for _ in range(repeat + 1):
+        before = engine.call_count()
+        started = time.perf_counter()
+        response = await scenario.call()
+        latencies.append((time.perf_counter() - started) * 1000)
+        calls.append(engine.call_count() - before)
+
+    warm = latencies[1:]
+    return Result(
+        size=size,
+        scenario=scenario.name,
+        cold_ms=round(latencies[0], 2),
+        p50_ms=round(_percentile(warm, 0.5), 2),
+        p90_ms=round(_percentile(warm, 0.9), 2),
+        p99_ms=round(_percentile(warm, 0.99), 2),
+        cold_docker_calls=calls[0],
+        warm_docker_calls=round(sum(calls[1:]) / repeat, 2),
+        response_bytes=len(response.encode()),
+    )
+
+
+async def benchmark(
+    size: int, latency: float, repeat: int, only: list[str] | None = None
+) -> list[Result]:
+    """Run the scenarios against a fake engine serving `size` containers and images."""
+    engine = FakeEngine(size, latency).start()
+    client = docker.DockerClient(base_url=engine.base_url, version=API_VERSION)
+    request_ctx.set(
+        RequestContext(
+            request_id=1, meta=None, session=_NullSession(), lifespan_context={}
+        )
+    )
+    results = []
+    try:
+        with server._serving(ServerSettings(), client):
+            # Connect to the host (and start its event stream) before measuring
+            await asyncio.to_thread(server._hosts.get)
+            for scenario in scenarios():
+                if only and scenario.name.split(" ")[0] not in only:
+                    continue
+                if scenario.max_size is not None and size > scenario.max_size:
+                    continue
+                results.append(await _measure(engine, size, scenario, repeat))
+    finally:
+        client.close()
+        engine.stop()
+    return results
+
+
+def _print_table(results: list[Result]):
+    header = (
+        f"{'N':>6}  {'scenario':<28} {'cold ms':>9} {'p50 ms':>8} {'p90 ms':>8} "
+        f"{'p99 ms':>8} {'calls':>6} {'warm':>6} {'bytes':>10}"
+    )
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        print(
+            f"{r.size:>6}  {r.scenario:<28} {r.cold_ms:>9.2f} {r.p50_ms:>8.2f} "
+            f"{r.p90_ms:>8.2f} {r.p99_ms:>8.2f} {r.cold_docker_calls:>6} "
+            f"{r.warm_docker_calls:>6g} {r.response_bytes:>10}"
+        )
+
+
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--sizes",
+        default="10,1000,10000",
+        help="Comma-separated numbers of containers to benchmark with",
+    )
+    parser.add_argument(
+        "--latency",
+        type=float,
+        default=0.0,
+        help="Seconds the fake engine waits before answering each request",
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=20, help="Warm calls per scenario"
+    )
+    parser.add_argument(
+        "--only",
+        help="Comma-separated tools, e.g. `list_containers,get_prompt`, to benchmark",
+    )
+    parser.add_argument("--json", help="Also write the results as JSON to this file")
+    args = parser.parse_args(argv)
+
+    only = args.only.split(",") if args.only else None
+    results = []
+    for size in (int(s) for s in args.sizes.split(",")):
+        print(f"Benchmarking with {size} containers...", file=sys.stderr)
+        results += asyncio.run(benchmark(size, args.latency, args.repeat, only))
+
+    _print_table(results)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump([asdict(r) for r in results], f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""
+Check the cold start of the server against time budgets: importing the
+package, and answering `initialize` and `tools/list` over Standard I/O in a
+fresh process. Neither may import the Docker SDK or connect to Docker.
+
+    python -m benchmarks.startup --import-budget 1.0 --handshake-budget 2.0
+
+Exits with an error if a budget is exceeded, taking the best of `--repeat`
+runs to smooth out noise.
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+# Imports the package as the entry point does, then reports what got imported
+_IMPORT_PROBE = """
+import sys, time
+started = time.perf_counter()
+import mcp_server_docker
+elapsed = time.perf_counter() - started
+print(elapsed, "docker" in sys.modules)
+"""
+
+_REQUESTS = [
+    {
+        "jsonrpc": "2.0",
+        "id": 1,
+        "method": "initialize",
+        "params": {
+            "protocolVersion": "2025-03-26",
+            "capabilities": {},
+            "clientInfo": {"name": "benchmark", "version": "0"},
+        },
+    },
+    {"jsonrpc": "2.0", "method": "notifications/initialized"},
+    {"jsonrpc": "2.0", "id": 2, "method": "tools/list"},
+]
+
+
+def _env() -> dict[str, str]:
+    # Docker must not be reached, so point it at an address that can't answer
+    return {**os.environ, "DOCKER_HOST": "tcp://127.0.0.1:9"}
+
+
+def measure_import() -> tuple[float, bool]:
+    """Seconds to import the package in a fresh process, and whether it imported the Docker SDK."""
+    output = subprocess.run(
+        [sys.executable, "-c", _IMPORT_PROBE],
+        env=_env(),
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout.split()
+    return float(output[0]), output[1] == "True"
+
+
+def measure_handshake() -> tuple[float, int]:
+    """
+    Seconds from starting the server until it lists its tools over Standard
+    I/O, and the number of tools listed.
+    """
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "mcp_server_docker"],
+        env={**_env(), "MCP_SERVER_TRANSPORT": "stdio"},
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+        text=True,
+    )
+    assert process.stdin is not None and process.stdout is not None
+    try:
+        for request in _REQUESTS:
+            process.stdin.write(json.dumps(request) + "\n")
+        process.stdin.flush()
+        for line in process.stdout:
+            message = json.loads(line)
+            if message.get("id") == 2:
+                return time.perf_counter() - started, len(message["result"]["tools"])
+        raise RuntimeError("The server exited before listing its tools")
+    finally:
+        process.kill()
+        process.wait()
+
+
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--import-budget",
+        type=float,
+        default=1.0,
+        help="Maximum seconds to import the package",
+    )
+    parser.add_argument(
+        "--handshake-budget",
+        type=float,
+        default=2.0,
+        help="Maximum seconds from starting the server until it lists its tools",
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=3, help="Runs to take the best of"
+    )
+    args = parser.parse_args(argv)
+
+    import_runs = [measure_import() for _ in range(args.repeat)]
+    import_seconds = min(seconds for seconds, _ in import_runs)
+    imports_docker = any(docker for _, docker in import_runs)
+    handshake_runs = [measure_handshake() for _ in range(args.repeat)]
+    handshake_seconds = min(seconds for seconds, _ in handshake_runs)
+
+    print(
+        f"import:    {import_seconds * 1000:8.1f} ms (budget {args.import_budget * 1000:.0f} ms)"
+    )
+    print(
+        f"handshake: {handshake_seconds * 1000:8.1f} ms (budget {args.handshake_budget * 1000:.0f} ms), "
+        f"{handshake_runs[0][1]} tools listed"
+    )
+
+    failures = []
+    if imports_docker:
+        failures.append("importing the package imports the Docker SDK")
+    if import_seconds > args.import_budget:
+        failures.append("importing the package is over budget")
+    if handshake_seconds > args.handshake_budget:
+        failures.append("answering initialize and tools/list is over budget")
+    if failures:
+        sys.exit("FAILED: " + "; ".join(failures))
+
+
+if __name__ == "__main__":
+    main()
@@ -4,12 +4,13 @@ const path = require('path');
 
 // Try uv first, fallback to python3
 const pythonCmd = require('fs').existsSync(path.join(__dirname, 'pyproject.toml')) ? 'uv' : 'python3';
-const args = pythonCmd === 'uv' ? ['run', 'python', 'src/mcp_server_docker/main.py'] : ['src/mcp_server_docker/main.py'];
+const args = pythonCmd === 'uv' ? ['run', 'mcp-server-docker'] : ['-m', 'mcp_server_docker'];
 
 const child = spawn(pythonCmd, args, {
   stdio: 'inherit',
   cwd: __dirname,
-  env: { ...process.env }
+  // Without uv, run the package from the source tree
+  env: { ...process.env, PYTHONPATH: path.join(__dirname, 'src') }
 });
 
 child.on('close', (code) => {
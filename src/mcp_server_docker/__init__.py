@@ -1,16 +1,19 @@
 import asyncio
 
-import docker
-
-from .server import run_stdio
+from .app import run_http, run_stdio
 from .settings import ServerSettings
 
 
 def main():
     """Run the server sourcing configuration from environment variables."""
-    asyncio.run(run_stdio(ServerSettings(), docker.from_env()))
+    settings = ServerSettings()
+    # The Docker SDK is only imported, and hosts connected to, on first use
+    if settings.transport == "stdio":
+        asyncio.run(run_stdio(settings))
+    else:
+        asyncio.run(run_http(settings))
 
 
 # Optionally expose other important items at package level
-__all__ = ["main", "run_stdio", "ServerSettings"]
+__all__ = ["main", "run_http", "run_stdio", "ServerSettings"]
 
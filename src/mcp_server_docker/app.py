@@ -0,0 +1,300 @@
+"""
+The MCP server's entry point. It answers the handshake and the listings of
+tools and prompts on its own, from the precomputed tool manifest, and loads
+the `server` module, with the Docker SDK, only once a request needs Docker.
+This keeps the cold start of a session short.
+"""
+
+import asyncio
+import contextlib
+import functools
+import importlib
+import json
+from collections.abc import AsyncIterator, Iterator, Sequence
+from pathlib import Path
+from types import ModuleType
+from typing import TYPE_CHECKING, Any
+
+from mcp import types
+from mcp.server import Server
+from pydantic import AnyUrl
+
+from .metrics import metrics, serve_prometheus
+from .settings import ServerSettings
+
+if TYPE_CHECKING:
+    import docker
+
+
+class _DockerServer(Server):
+    def get_capabilities(self, *args: Any, **kwargs: Any) -> types.ServerCapabilities:
+        capabilities = super().get_capabilities(*args, **kwargs)
+        # The low-level server doesn't advertise subscriptions even when handled
+        if capabilities.resources is not None:
+            capabilities.resources.subscribe = True
+        return capabilities
+
+
+app = _DockerServer("docker-server")
+
+# The definitions of the tools, generated by `python -m mcp_server_docker.manifest`
+MANIFEST_PATH = Path(__file__).with_name("tool_manifest.json")
+
+
+class _Backend:
+    """
+    The `server` module, which handles the requests that need Docker, loaded
+    on first use along with the state it shares between sessions.
+    """
+
+    def __init__(
+        self, settings: ServerSettings, docker_client: "docker.DockerClient | None"
+    ):
+        self._settings = settings
+        self._docker_client = docker_client
+        self._server: ModuleType | None = None
+        self._lock = asyncio.Lock()
+        self._stack = contextlib.ExitStack()
+
+    @property
+    def loaded(self) -> ModuleType | None:
+        return self._server
+
+    async def load(self) -> ModuleType:
+        if self._server is not None:
+            return self._server
+        async with self._lock:
+            if self._server is None:
+                # Importing the Docker SDK takes a while; don't block other sessions
+                server = await asyncio.to_thread(
+                    importlib.import_module, ".server", __package__
+                )
+                self._stack.enter_context(
+                    server._serving(self._settings, self._docker_client)
+                )
+                self._server = server
+        return self._server
+
+    def close(self):
+        self._stack.close()
+
+
+_backend: _Backend
+
+
+@contextlib.contextmanager
+def _serving(
+    settings: ServerSettings, docker_client: "docker.DockerClient | None"
+) -> Iterator[None]:
+    """
+    Serve requests with the given settings, loading the `server` module when
+    first needed, and tearing it down on exit.
+    """
+    global _backend
+    _backend = _Backend(settings, docker_client)
+
+    prometheus = None
+    if settings.metrics_port is not None:
+
+        def render() -> str:
+            server = _backend.loaded
+            return metrics.prometheus(server._cache_stats() if server else {})
+
+        prometheus = serve_prometheus(render, settings.http_host, settings.metrics_port)
+
+    try:
+        yield
+    finally:
+        if prometheus is not None:
+            prometheus.shutdown()
+        _backend.close()
+
+
+@functools.cache
+def _load_tools() -> tuple[types.Tool, ...]:
+    with MANIFEST_PATH.open() as f:
+        return tuple(types.Tool.model_validate(tool) for tool in json.load(f))
+
+
+@app.list_tools()
+async def list_tools() -> list[types.Tool]:
+    return list(_load_tools())
+
+
+@app.list_prompts()
+async def list_prompts() -> list[types.Prompt]:
+    return [
+        types.Prompt(
+            name="docker_compose",
+            description="Treat the LLM like a Docker Compose manager",
+            arguments=[
+                types.PromptArgument(
+                    name="name", description="Unique name of the project", required=True
+                ),
+                types.PromptArgument(
+                    name="containers",
+                    description="Describe containers you want",
+                    required=True,
+                ),
+            ],
+        )
+    ]
+
+
+@app.get_prompt()
+async def get_prompt(
+    name: str, arguments: dict[str, str] | None
+) -> types.GetPromptResult:
+    server = await _backend.load()
+    return await server.get_prompt(name, arguments)
+
+
+async def _list_resources(request: types.ListResourcesRequest) -> types.ServerResult:
+    server = await _backend.load()
+    cursor = request.params.cursor if request.params else None
+    resources, next_cursor = await server.list_resources(cursor)
+    return types.ServerResult(
+        types.ListResourcesResult(resources=resources, nextCursor=next_cursor)
+    )
+
+
+# The low-level server's `list_resources` decorator doesn't pass the cursor
+app.request_handlers[types.ListResourcesRequest] = _list_resources
+
+
+@app.list_resource_templates()
+async def list_resource_templates() -> list[types.ResourceTemplate]:
+    return [
+        types.ResourceTemplate(
+            uriTemplate="docker://containers/{container_id}/logs",
+            name="Container logs",
+            description="The last 100 lines of logs of a container, by ID or name. Can be subscribed to",
+            mimeType="text/plain",
+        ),
+        types.ResourceTemplate(
+            uriTemplate="docker://containers/{container_id}/stats",
+            name="Container stats",
+            description="Live CPU, memory, network and block IO usage of a container, by ID or name. Can be subscribed to",
+            mimeType="application/json",
+        ),
+        types.ResourceTemplate(
+            uriTemplate="docker://containers/{container_id}/inspect",
+            name="Container details",
+            description="Configuration and state of a container, by ID or name",
+            mimeType="application/json",
+        ),
+        types.ResourceTemplate(
+            uriTemplate="docker://images/{image}",
+            name="Image details",
+            description="An image, by ID or reference (e.g. `nginx:latest`)",
+            mimeType="application/json",
+        ),
+        types.ResourceTemplate(
+            uriTemplate="docker://volumes/{volume_name}",
+            name="Volume details",
+            description="A volume, by name",
+            mimeType="application/json",
+        ),
+    ]
+
+
+@app.read_resource()
+async def read_resource(uri: AnyUrl) -> str:
+    server = await _backend.load()
+    return await server.read_resource(uri)
+
+
+@app.subscribe_resource()
+async def subscribe_resource(uri: AnyUrl) -> None:
+    server = await _backend.load()
+    await server.subscribe_resource(uri)
+
+
+@app.unsubscribe_resource()
+async def unsubscribe_resource(uri: AnyUrl) -> None:
+    # Nothing can be subscribed to before the server is loaded
+    server = _backend.loaded
+    if server is not None:
+        await server.unsubscribe_resource(uri)
+
+
+@app.call_tool()
+async def call_tool(
+    name: str, arguments: Any
+) -> Sequence[types.TextContent | types.ImageContent | types.EmbeddedResource]:
+    server = await _backend.load()
+    return await server.call_tool(name, arguments)
+
+
+async def run_stdio(
+    settings: ServerSettings, docker_client: "docker.DockerClient | None" = None
+):
+    """
+    Run the server on Standard I/O with the given settings. If a Docker client
+    is given, it's the only host, overriding the hosts of the settings.
+    """
+    from mcp.server.stdio import stdio_server
+
+    with _serving(settings, docker_client):
+        async with stdio_server() as (read_stream, write_stream):
+            await app.run(
+                read_stream, write_stream, app.create_initialization_options()
+            )
+
+
+async def run_http(
+    settings: ServerSettings, docker_client: "docker.DockerClient | None" = None
+):
+    """
+    Run the server over HTTP with the given settings (and optionally a Docker
+    client, as for `run_stdio`), using the Streamable HTTP transport (at `/mcp`)
+    or the SSE transport (at `/sse`).
+
+    All client sessions share the Docker client, caches and background streams.
+    """
+    import uvicorn
+    from starlette.applications import Starlette
+    from starlette.requests import Request
+    from starlette.responses import Response
+    from starlette.routing import Mount, Route
+
+    if settings.transport == "sse":
+        from mcp.server.sse import SseServerTransport
+
+        sse = SseServerTransport("/messages/")
+
+        async def handle_sse(request: Request) -> Response:
+            async with sse.connect_sse(
+                request.scope, request.receive, request._send
+            ) as (read_stream, write_stream):
+                await app.run(
+                    read_stream, write_stream, app.create_initialization_options()
+                )
+            return Response()
+
+        http_app = Starlette(
+            routes=[
+                Route("/sse", endpoint=handle_sse, methods=["GET"]),
+                Mount("/messages/", app=sse.handle_post_message),
+            ]
+        )
+    else:
+        from mcp.server.streamable_http_manager import StreamableHTTPSessionManager
+
+        session_manager = StreamableHTTPSessionManager(app=app)
+
+        @contextlib.asynccontextmanager
+        async def lifespan(_: Starlette) -> AsyncIterator[None]:
+            async with session_manager.run():
+                yield
+
+        http_app = Starlette(
+            routes=[Mount("/mcp", app=session_manager.handle_request)],
+            lifespan=lifespan,
+        )
+
+    config = uvicorn.Config(
+        http_app, host=settings.http_host, port=settings.http_port, log_level="info"
+    )
+    with _serving(settings, docker_client):
+        await uvicorn.Server(config).serve()
@@ -0,0 +1,140 @@
+import os
+import re
+import stat
+from collections import deque
+from collections.abc import Callable
+from dataclasses import dataclass
+from typing import IO, Any
+
+import docker
+from docker.api.build import process_dockerfile
+from docker.errors import BuildError
+from docker.models.images import Image
+from docker.utils.build import create_archive, exclude_paths
+
+# Called with the current step and step count (if known), and a line of output
+ProgressCallback = Callable[[int, int | None, str], None]
+
+_REMOTE_CONTEXT = ("http://", "https://", "git://", "github.com/", "git@")
+# Steps of the classic builder, e.g. "Step 2/5 : RUN make"
+_STEP = re.compile(r"^Step (\d+)/(\d+) :")
+_IMAGE_ID = re.compile(r"(^Successfully built |sha256:)([0-9a-f]+)$")
+
+
+@dataclass
+class BuildContext:
+    # Tar archive of the files sent to the daemon, or None for a remote context
+    archive: IO[bytes] | None
+    dockerfile: str | None
+    files: int
+    size: int
+
+
+def _dockerignore(root: str) -> list[str]:
+    """The exclusion patterns of a context's `.dockerignore`, read like the Docker SDK does."""
+    try:
+        with open(os.path.join(root, ".dockerignore")) as f:
+            lines = [line.strip() for line in f.read().splitlines()]
+    except FileNotFoundError:
+        return []
+    return [line for line in lines if line and not line.startswith("#")]
+
+
+def prepare_context(
+    path: str, dockerfile: str | None, max_size: int | None
+) -> BuildContext:
+    """
+    Select the files of a build context honoring its `.dockerignore`, and
+    archive them, unless their total size exceeds `max_size` bytes. The files
+    are only listed once, for both the size check and the archive.
+    """
+    if path.startswith(_REMOTE_CONTEXT):
+        return BuildContext(None, dockerfile, 0, 0)
+    if not os.path.isdir(path):
+        raise ValueError(f"Build context {path} is not a directory")
+
+    root = os.path.abspath(path)
+    exclude = _dockerignore(root)
+    dockerfile_name, dockerfile_contents = process_dockerfile(dockerfile, root)
+    files = sorted(exclude_paths(root, list(exclude), dockerfile=dockerfile_name))
+
+    size = count = 0
+    for name in files:
+        info = os.lstat(os.path.join(root, name))
+        if not stat.S_ISDIR(info.st_mode):
+            size += info.st_size
+            count += 1
+    if max_size is not None and size > max_size:
+        raise ValueError(
+            f"Build context {path} holds {size} bytes in {count} files after "
+            f".dockerignore, over the limit of {max_size} bytes. Exclude the "
+            "files the build doesn't need in .dockerignore"
+        )
+
+    # Like the Docker SDK, add a Dockerfile from outside the context to the archive
+    extra_files = []
+    if dockerfile_contents is not None:
+        extra_files = [
+            (
+                ".dockerignore",
+                "\n".join((exclude or [".dockerignore"]) + [dockerfile_name]),
+            ),
+            (dockerfile_name, dockerfile_contents),
+        ]
+    archive = create_archive(root, files=files, extra_files=extra_files)
+    return BuildContext(archive, dockerfile_name, count, size)
+
+
+def build_image(
+    client: docker.DockerClient,
+    context: BuildContext,
+    path: str,
+    *,
+    on_progress: ProgressCallback,
+    log_tail: int,
+    **kwargs: Any,
+) -> tuple[Image, list[str]]:
+    """
+    Build an image from a prepared context, streaming the build output to
+    `on_progress` as it comes rather than buffering it.
+
+    Returns the image, along with the last `log_tail` lines of output. On
+    failure, the error raised includes these lines.
+    """
+    if context.archive is not None:
+        kwargs.update(fileobj=context.archive, custom_context=True)
+    else:
+        kwargs["path"] = path
+
+    tail: deque[str] = deque(maxlen=log_tail)
+    image_id = None
+    lines = 0
+    step_count = None
+    for chunk in client.api.build(dockerfile=context.dockerfile, decode=True, **kwargs):
+        if "error" in chunk:
+            output = "\n".join(tail)
+            raise BuildError(
+                f"{chunk['error'].strip()}\n\nLast build output:\n{output}",
+                [{"stream": line} for line in tail],
+            )
+        if "ID" in (chunk.get("aux") or {}):
+            image_id = chunk["aux"]["ID"]
+
+        for line in (chunk.get("stream") or "").splitlines():
+            line = line.rstrip()
+            if not line:
+                continue
+            tail.append(line)
+            lines += 1
+            if match := _IMAGE_ID.search(line):
+                image_id = image_id or match.group(2)
+            if match := _STEP.match(line):
+                step_count = int(match.group(2))
+                on_progress(int(match.group(1)), step_count, line)
+            elif step_count is None:
+                # Without steps to count, count lines of output
+                on_progress(lines, None, line)
+
+    if image_id is None:
+        raise BuildError("The build didn't produce an image", [])
+    return client.images.get(image_id), list(tail)
@@ -0,0 +1,95 @@
+from collections.abc import Callable, Iterable, Mapping
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+
+from docker.errors import DockerException
+from requests import RequestException
+
+from .metrics import in_context
+
+
+def dependency_levels(
+    items: list[str], depends_on: Mapping[str, Iterable[str]], reverse: bool = False
+) -> tuple[list[list[str]], dict[str, set[str]]]:
+    """
+    Group `items` into levels, such that every item comes after the items it
+    depends on, or before them if `reverse`. Dependencies on items not in
+    `items` are ignored.
+
+    Returns the levels, and the prerequisites of each item, i.e. the items of
+    earlier levels that it must wait for.
+    """
+    selected = set(items)
+    prerequisites: dict[str, set[str]] = {item: set() for item in items}
+    for item in items:
+        for dependency in depends_on.get(item, ()):
+            if dependency not in selected or dependency == item:
+                continue
+            if reverse:
+                prerequisites[dependency].add(item)
+            else:
+                prerequisites[item].add(dependency)
+
+    levels: list[list[str]] = []
+    placed: set[str] = set()
+    remaining = list(items)
+    while remaining:
+        level = [item for item in remaining if prerequisites[item] <= placed]
+        if not level:
+            raise ValueError(
+                f"Circular dependency between containers: {', '.join(remaining)}"
+            )
+        levels.append(level)
+        placed.update(level)
+        remaining = [item for item in remaining if item not in placed]
+    return levels, prerequisites
+
+
+def run_ordered(
+    items: list[str],
+    action: Callable[[str], str],
+    *,
+    depends_on: Mapping[str, Iterable[str]] | None = None,
+    reverse: bool = False,
+    max_parallel: int,
+) -> list[dict[str, Any]]:
+    """
+    Run `action` on every item, at most `max_parallel` at once, in dependency
+    order (see `dependency_levels`). Items of the same level run concurrently.
+
+    Returns the result of each item, in the order of `items`: the status
+    returned by `action`, or the Docker error it raised. An item is skipped if
+    any of its prerequisites failed. Other errors propagate.
+    """
+    levels, prerequisites = dependency_levels(items, depends_on or {}, reverse)
+    results: dict[str, dict[str, Any]] = {}
+    failed: set[str] = set()
+
+    @in_context
+    def attempt(item: str) -> dict[str, Any]:
+        try:
+            return {"container": item, "status": action(item)}
+        except (DockerException, RequestException, TimeoutError) as e:
+            return {"container": item, "error": str(e)}
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_parallel, len(items)))) as pool:
+        for level in levels:
+            runnable = []
+            for item in level:
+                blocked = sorted(prerequisites[item] & failed)
+                if blocked:
+                    results[item] = {
+                        "container": item,
+                        "status": "skipped",
+                        "error": f"Skipped because {', '.join(blocked)} failed",
+                    }
+                    failed.add(item)
+                else:
+                    runnable.append(item)
+
+            for item, result in zip(runnable, pool.map(attempt, runnable)):
+                results[item] = result
+                if "error" in result:
+                    failed.add(item)
+
+    return [results[item] for item in items]
@@ -0,0 +1,67 @@
+import json
+from typing import Any, Literal
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# `json`: compact JSON. `pretty`: JSON indented by 2 spaces. `table`: compact
+# JSON, with lists of objects sent as columns and rows
+ResponseFormat = Literal["json", "pretty", "table"]
+
+
+def json_loads(data: str | bytes) -> Any:
+    """
+    Parse JSON with orjson if it's installed (the `fast` extra), falling back to
+    the standard library. Raises `ValueError` on invalid JSON either way.
+    """
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def json_dumps(value: Any, pretty: bool = False) -> str:
+    """Serialize to JSON with orjson if it's installed, else the standard library."""
+    if orjson is not None:
+        option = orjson.OPT_NON_STR_KEYS
+        if pretty:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(value, option=option).decode()
+    if pretty:
+        return json.dumps(value, indent=2, ensure_ascii=False)
+    return json.dumps(value, separators=(",", ":"), ensure_ascii=False)
+
+
+def _is_records(value: Any) -> bool:
+    return (
+        isinstance(value, list)
+        and bool(value)
+        and all(isinstance(item, dict) for item in value)
+    )
+
+
+def to_table(records: list[dict[str, Any]]) -> dict[str, Any]:
+    """
+    Turn a list of objects into `columns` and `rows`, so that keys repeated in
+    every object are only sent once. Missing keys become null.
+    """
+    columns = list(dict.fromkeys(key for record in records for key in record))
+    return {
+        "columns": columns,
+        "rows": [[record.get(column) for column in columns] for record in records],
+    }
+
+
+def encode_response(result: Any, response_format: ResponseFormat) -> str:
+    """
+    Serialize the result of a tool call or a resource read. The `table` format
+    applies to lists of objects, also when paginated under `items`; anything
+    else is sent as compact JSON.
+    """
+    if response_format == "table":
+        if _is_records(result):
+            result = to_table(result)
+        elif isinstance(result, dict) and _is_records(result.get("items")):
+            result = {**result, "items": to_table(result["items"])}
+    return json_dumps(result, pretty=response_format == "pretty")
@@ -0,0 +1,113 @@
+import threading
+import time
+from collections.abc import Callable
+from typing import Any
+
+import docker
+
+# Called with the bytes of output received so far, the last line received, and
+# whether the output has ended
+ProgressCallback = Callable[[int, str, bool], None]
+
+# Longest line of output sent as a progress message
+_MAX_MESSAGE = 200
+
+
+class _Tail:
+    """The last `max_bytes` bytes of an output stream, counting those dropped before them."""
+
+    def __init__(self, max_bytes: int):
+        self._max_bytes = max_bytes
+        self._data = bytearray()
+        self.dropped = 0
+
+    def append(self, chunk: bytes):
+        self._data += chunk
+        excess = len(self._data) - self._max_bytes
+        if excess > 0:
+            del self._data[:excess]
+            self.dropped += excess
+
+    def text(self) -> str:
+        text = self._data.decode(errors="replace")
+        if self.dropped:
+            text = f"[... {self.dropped} earlier bytes truncated ...]\n{text}"
+        return text
+
+
+def _last_line(chunk: bytes) -> str:
+    lines = chunk.decode(errors="replace").strip().splitlines()
+    return lines[-1][:_MAX_MESSAGE] if lines else ""
+
+
+def exec_in_container(
+    client: docker.DockerClient,
+    container_id: str,
+    command: str | list[str],
+    *,
+    on_progress: ProgressCallback,
+    max_bytes: int,
+    timeout: float | None,
+    **kwargs: Any,
+) -> dict[str, Any]:
+    """
+    Run a command in a running container, streaming its stdout and stderr
+    apart as they come, and keeping only the last `max_bytes` of each.
+
+    If the command is still running after `timeout` seconds, stop reading its
+    output and return what was received. Docker can't stop an exec, so the
+    command keeps running in the container, and has no exit code yet.
+    """
+    api = client.api
+    exec_id = api.exec_create(
+        container_id, command, stdout=True, stderr=True, **kwargs
+    )["Id"]
+    started = time.monotonic()
+    stream = api.exec_start(exec_id, stream=True, demux=True)
+
+    expired = threading.Event()
+
+    def expire():
+        expired.set()
+        stream.close()
+
+    timer = None
+    if timeout is not None:
+        timer = threading.Timer(timeout, expire)
+        timer.daemon = True
+        timer.start()
+
+    stdout, stderr = _Tail(max_bytes), _Tail(max_bytes)
+    received = 0
+    last_line = ""
+    try:
+        for out, err in stream:
+            for tail, chunk in ((stdout, out), (stderr, err)):
+                if chunk:
+                    tail.append(chunk)
+                    received += len(chunk)
+                    last_line = _last_line(chunk) or last_line
+                    on_progress(received, last_line, False)
+    except Exception:
+        # Closing the stream on timeout fails the read in progress
+        if not expired.is_set():
+            raise
+    finally:
+        if timer is not None:
+            timer.cancel()
+        stream.close()
+    duration = time.monotonic() - started
+    if received:
+        # Throttling may have dropped the latest report
+        on_progress(received, last_line, True)
+
+    # The command may have ended just as the timeout expired
+    state = api.exec_inspect(exec_id)
+    running = bool(state.get("Running"))
+    return {
+        "exit_code": None if running else state.get("ExitCode"),
+        "timed_out": running,
+        "duration": round(duration, 3),
+        "stdout": stdout.text(),
+        "stderr": stderr.text(),
+    }
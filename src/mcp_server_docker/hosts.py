@@ -0,0 +1,224 @@
+import functools
+import threading
+import time
+from collections.abc import Callable, Iterable
+from concurrent.futures import ThreadPoolExecutor
+
+import docker
+from docker.errors import DockerException
+from requests import RequestException
+
+from .inventory import InventoryCache
+from .metrics import in_context, metrics
+from .pulls import ImagePulls
+from .settings import ServerSettings
+from .stats import StatsCollector
+from .subscriptions import ResourceSubscriptions
+
+# Name of the host configured from the environment when no hosts are configured
+DEFAULT_HOST = "default"
+
+
+class DockerHost:
+    """
+    A Docker daemon, along with the cache and background streams of its objects.
+
+    The client connects on first use rather than at startup. Before use, the
+    daemon is pinged again if it wasn't for `host_health_interval` seconds. A
+    failure to connect or ping is remembered for as long, during which the host
+    fails fast instead of being dialled again.
+    """
+
+    client: docker.DockerClient
+    inventory: InventoryCache
+    pulls: ImagePulls
+    stats: StatsCollector
+    subscriptions: ResourceSubscriptions
+
+    def __init__(
+        self,
+        name: str,
+        connect: Callable[[], docker.DockerClient],
+        settings: ServerSettings,
+    ):
+        self.name = name
+        self._connect = connect
+        self._settings = settings
+        # Held while connecting, pinging or closing
+        self._lock = threading.Lock()
+        self._connected = False
+        # Monotonic time of the last successful ping
+        self._checked = 0.0
+        # The last failure to connect or ping, and its monotonic time
+        self._failure: Exception | None = None
+        self._failed_at = 0.0
+
+    @property
+    def connected(self) -> bool:
+        return self._connected
+
+    def ensure_ready(self) -> "DockerHost":
+        """Connect to the daemon if not done yet, or check that it's still reachable."""
+        if self._known_ready():
+            return self
+        # While another call pings a connected host, use it rather than wait;
+        # a host not connected yet can only be used once connected
+        if not self._lock.acquire(blocking=not self._connected):
+            return self
+        try:
+            if self._known_ready():
+                return self
+            try:
+                if not self._connected:
+                    self._open()
+                else:
+                    self.client.ping()
+            except (DockerException, RequestException) as e:
+                self._failure, self._failed_at = e, time.monotonic()
+                raise self._unreachable(e) from e
+            self._failure = None
+            self._checked = time.monotonic()
+        finally:
+            self._lock.release()
+        return self
+
+    def _known_ready(self) -> bool:
+        """
+        Whether the host was reachable within `host_health_interval` seconds.
+        Raises if it wasn't within that time.
+        """
+        interval = self._settings.host_health_interval
+        now = time.monotonic()
+        failure = self._failure
+        if failure is not None and now - self._failed_at < interval:
+            raise self._unreachable(failure)
+        return self._connected and now - self._checked <= interval
+
+    def _unreachable(self, failure: Exception) -> DockerException:
+        return DockerException(f"Docker host {self.name} is unreachable: {failure}")
+
+    def close(self):
+        with self._lock:
+            if not self._connected:
+                return
+            self.subscriptions.close()
+            self.stats.close()
+            self.inventory.stop()
+            self.client.close()
+            self._connected = False
+
+    def _open(self):
+        settings = self._settings
+        client = self._connect()
+        client.api.hooks["response"].append(metrics.docker_call_hook(self.name))
+        try:
+            client.ping()
+        except BaseException:
+            # Don't leak the connection pool of every failed attempt
+            client.close()
+            raise
+
+        self.client = client
+        self.inventory = InventoryCache(client, settings.cache_ttl)
+        self.inventory.start()
+        self.pulls = ImagePulls(client)
+        self.stats = StatsCollector(
+            client, settings.stats_window, settings.stats_idle_timeout
+        )
+        self.subscriptions = ResourceSubscriptions(
+            client, self.stats, settings.subscription_min_interval
+        )
+        self._checked = time.monotonic()
+        self._connected = True
+
+
+class DockerHosts:
+    """The Docker hosts managed by the server, by name."""
+
+    def __init__(self, hosts: list[DockerHost], default: str):
+        self._hosts = {host.name: host for host in hosts}
+        if default not in self._hosts:
+            raise ValueError(f"Unknown default Docker host: {default}")
+        self.default = default
+        # Runs calls to several hosts in parallel. Each host has its own
+        # connection pool, so a slow host doesn't hold up the others
+        self._pool = ThreadPoolExecutor(
+            max_workers=len(self._hosts), thread_name_prefix="docker-hosts"
+        )
+
+    @classmethod
+    def from_settings(
+        cls, settings: ServerSettings, client: docker.DockerClient | None = None
+    ) -> "DockerHosts":
+        """
+        Set up the hosts of the settings. If there are none, there's a single
+        host configured from the environment like the Docker CLI. A given client
+        is the single host, whatever the settings.
+        """
+        if client is not None:
+            return cls(
+                [DockerHost(DEFAULT_HOST, lambda: client, settings)], DEFAULT_HOST
+            )
+        if not settings.docker_hosts:
+            # Size the connection pool to match the number of concurrent Docker calls
+            connect = functools.partial(
+                docker.from_env, max_pool_size=settings.docker_max_workers
+            )
+            return cls([DockerHost(DEFAULT_HOST, connect, settings)], DEFAULT_HOST)
+
+        hosts = [
+            DockerHost(
+                name,
+                functools.partial(
+                    docker.DockerClient,
+                    base_url=host.base_url,
+                    max_pool_size=host.max_pool_size or settings.docker_max_workers,
+                    use_ssh_client=host.use_ssh_client,
+                ),
+                settings,
+            )
+            for name, host in settings.docker_hosts.items()
+        ]
+        return cls(hosts, settings.default_host or hosts[0].name)
+
+    @property
+    def names(self) -> list[str]:
+        return list(self._hosts)
+
+    def get(self, name: str | None = None) -> DockerHost:
+        """Return a ready host given its name, or the default host."""
+        host = self._hosts.get(name or self.default)
+        if host is None:
+            raise ValueError(
+                f"Unknown Docker host: {name}. Configured hosts: {', '.join(self._hosts)}"
+            )
+        return host.ensure_ready()
+
+    def connected(self) -> list[DockerHost]:
+        return [host for host in self._hosts.values() if host.connected]
+
+    def map[T](
+        self, func: Callable[[DockerHost], T], hosts: Iterable[DockerHost] | None = None
+    ) -> list[tuple[DockerHost, T | Exception]]:
+        """
+        Call `func` with each of `hosts` (all hosts if None) once ready, in
+        parallel. Returns each host with the result of the call, or the Docker
+        error it raised, so that an unreachable host doesn't fail the others.
+        """
+        hosts = list(self._hosts.values()) if hosts is None else list(hosts)
+
+        @in_context
+        def call(host: DockerHost) -> T | Exception:
+            try:
+                return func(host.ensure_ready())
+            except (DockerException, RequestException, TimeoutError) as e:
+                return e
+
+        if len(hosts) == 1:
+            return [(hosts[0], call(hosts[0]))]
+        return list(zip(hosts, self._pool.map(call, hosts)))
+
+    def close(self):
+        for host in self._hosts.values():
+            host.close()
+        self._pool.shutdown(wait=False, cancel_futures=True)
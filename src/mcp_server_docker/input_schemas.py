@@ -1,16 +1,32 @@
-import json
+import re
 from datetime import datetime
-from typing import Any, Literal, get_args, get_origin
+from types import UnionType
+from typing import Any, ClassVar, Literal, Union, get_args, get_origin
 
 from pydantic import (
     BaseModel,
     Field,
-    ValidationInfo,
     computed_field,
     field_validator,
     model_validator,
 )
 
+from .encoding import ResponseFormat, json_loads
+from .pagination import decode_cursor
+
+# Types whose values are never parsed from a JSON string
+_SCALAR_TYPES = (str, int, float, bool, datetime, type(None))
+
+
+def _may_hold_json(annotation: Any) -> bool:
+    """Whether a field of this type may be given as a JSON-encoded string."""
+    origin = get_origin(annotation)
+    if origin is Literal:
+        return False
+    if origin in (Union, UnionType):
+        return any(_may_hold_json(arg) for arg in get_args(annotation))
+    return annotation not in _SCALAR_TYPES
+
 
 class JSONParsingModel(BaseModel):
     """
@@ -22,45 +38,190 @@ class JSONParsingModel(BaseModel):
     But it does send valid JSON!
     """
 
-    @field_validator("*", mode="before")
-    @classmethod
-    def _try_parse_json(cls, value: Any, info: ValidationInfo):
-        if not isinstance(value, str):
-            return value
-
-        fields = cls.model_fields
-        field_name = info.field_name
-
-        if field_name not in fields:
-            return value
-
-        field = fields[field_name]
-        field_type = field.annotation
-
-        # Handle Optional/Union types
-        origin = get_origin(field_type)
-        if origin is not None:
-            args = get_args(field_type)
-            # Find the non-None type in case of Optional
-            field_type = next(
-                (arg for arg in args if arg is not type(None)), field_type
-            )
+    # Names of the fields that may be given as JSON-encoded strings, computed
+    # once per model class rather than on every validation
+    __json_fields__: ClassVar[frozenset[str]] = frozenset()
+    # Names of the fields that decode JSON strings on their own, as their plain
+    # strings may also be valid JSON
+    __raw_fields__: ClassVar[frozenset[str]] = frozenset()
 
-        # Don't try to parse strings, numbers, or dates
-        if field_type in (str, int, float, bool, datetime):
-            return value
-
-        try:
-            return json.loads(value)
-        except json.JSONDecodeError:
-            return value
+    @classmethod
+    def __pydantic_init_subclass__(cls, **kwargs: Any):
+        super().__pydantic_init_subclass__(**kwargs)
+        cls.__json_fields__ = frozenset(
+            name
+            for name, field in cls.model_fields.items()
+            if name not in cls.__raw_fields__ and _may_hold_json(field.annotation)
+        )
+
+    @model_validator(mode="before")
+    @classmethod
+    def _try_parse_json(cls, data: Any) -> Any:
+        if not isinstance(data, dict):
+            return data
+
+        parsed = None
+        for name in cls.__json_fields__:
+            value = data.get(name)
+            if not isinstance(value, str):
+                continue
+            try:
+                decoded = json_loads(value)
+            except ValueError:
+                continue
+            if parsed is None:
+                parsed = dict(data)
+            parsed[name] = decoded
+
+        return data if parsed is None else parsed
+
+
+class HostInput(JSONParsingModel):
+    """Inputs of the tools, which can target any of the Docker hosts of the server."""
+
+    host: str | None = Field(
+        None,
+        exclude=True,
+        description="Name of the Docker host to use, if the server manages several. Defaults to the server's default host",
+    )
 
 
-class FetchContainerLogsInput(JSONParsingModel):
+class FetchContainerLogsInput(HostInput):
     container_id: str = Field(..., description="Container ID or name")
     tail: int | Literal["all"] = Field(
         100, description="Number of lines to show from the end"
     )
+    since: datetime | None = Field(
+        None, description="Only show logs since this time (ISO 8601 or UNIX timestamp)"
+    )
+    until: datetime | None = Field(
+        None, description="Only show logs before this time (ISO 8601 or UNIX timestamp)"
+    )
+    stdout: bool = Field(True, description="Include the container's stdout")
+    stderr: bool = Field(True, description="Include the container's stderr")
+    grep: str | None = Field(
+        None,
+        description="Only show lines matching this regular expression (Python syntax)",
+    )
+    max_lines: int | None = Field(
+        None, ge=1, description="Return at most this many lines, keeping the newest"
+    )
+    max_bytes: int | None = Field(
+        256 * 1024,
+        ge=1,
+        description="Return at most this many bytes of logs, keeping the newest lines",
+    )
+    cursor: str | None = Field(
+        None,
+        description="The `cursor` returned by a previous call, to only fetch lines logged since then. `tail` is ignored when given",
+    )
+
+    @field_validator("grep")
+    @classmethod
+    def validate_grep(cls, value: str | None) -> str | None:
+        if value is not None:
+            try:
+                re.compile(value)
+            except re.error as e:
+                raise ValueError(f"Invalid regular expression: {e}") from None
+        return value
+
+
+class ExecInContainerInput(HostInput):
+    __raw_fields__ = frozenset({"command"})
+
+    container_id: str = Field(..., description="Container ID or name")
+    command: str | list[str] = Field(
+        ...,
+        description='Command to run, as a list of arguments or a string split like a shell would. Pipes and other shell features need a shell, e.g. `["sh", "-c", "ps aux | grep nginx"]`',
+    )
+    workdir: str | None = Field(
+        None, description="Working directory to run the command in"
+    )
+    environment: dict[str, str] | None = Field(
+        None, description="Environment variables to set for the command"
+    )
+    user: str | None = Field(
+        None, description="User to run the command as, e.g. `root` or `1000:1000`"
+    )
+    timeout: float | None = Field(
+        30,
+        gt=0,
+        exclude=True,
+        description="Seconds after which to stop waiting for the command and return its output so far. The command keeps running in the container",
+    )
+    max_bytes: int = Field(
+        64 * 1024,
+        ge=1,
+        exclude=True,
+        description="Return at most this many bytes of each of stdout and stderr, keeping the last",
+    )
+
+    @field_validator("command", mode="before")
+    @classmethod
+    def validate_command(cls, value: Any) -> Any:
+        # Only a JSON list of strings is a list of arguments: other strings,
+        # such as `true` or `"x"`, are commands even when they're valid JSON
+        if isinstance(value, str) and value.lstrip().startswith("["):
+            try:
+                decoded = json_loads(value)
+            except ValueError:
+                return value
+            if isinstance(decoded, list) and all(isinstance(a, str) for a in decoded):
+                return decoded
+        return value
+
+
+class ResponseFormatInput(HostInput):
+    """Inputs of the listing tools, which can also list objects across all hosts."""
+
+    host: str | None = Field(
+        None,
+        exclude=True,
+        description="Name of the Docker host to use, if the server manages several, or `*` to list across all of them in parallel. Objects then carry the name of their `host`. Defaults to the server's default host",
+    )
+    response_format: ResponseFormat | None = Field(
+        None,
+        exclude=True,
+        description="`table` sends the objects as `columns` and `rows`, which is much smaller for long lists. `json` (compact) or `pretty` (indented) send them as JSON objects. Defaults to the server's setting",
+    )
+
+
+class ListInput(ResponseFormatInput):
+    """Output options shared by the list tools. These aren't passed to the Docker SDK."""
+
+    detail: Literal["full", "summary"] = Field(
+        "full",
+        exclude=True,
+        description="`summary` returns a compact projection of each object straight from the list endpoint, which is much faster on hosts with many objects",
+    )
+    fields: list[str] | None = Field(
+        None,
+        exclude=True,
+        description='Only return these fields of each object, e.g. `["id", "name"]`',
+    )
+    limit: int | None = Field(
+        None,
+        ge=1,
+        exclude=True,
+        description="Return at most this many objects, along with the `total` count and a `next_cursor` for the next page",
+    )
+    cursor: str | None = Field(
+        None,
+        exclude=True,
+        description="The `next_cursor` returned by a previous call, to continue listing from there",
+    )
+
+    @field_validator("cursor")
+    @classmethod
+    def validate_cursor(cls, value: str | None) -> str | None:
+        if value is not None:
+            decode_cursor(value)
+        return value
+
+    @property
+    def paginated(self) -> bool:
+        return self.limit is not None or self.cursor is not None
 
 
 class ListContainersFilters(JSONParsingModel):
@@ -69,25 +230,35 @@ class ListContainersFilters(JSONParsingModel):
     )
 
 
-class ListContainersInput(JSONParsingModel):
+class ListContainersInput(ListInput):
     all: bool = Field(
         False, description="Show all containers (default shows just running)"
     )
     filters: ListContainersFilters | None = Field(None, description="Filter containers")
 
 
-class CreateContainerInput(JSONParsingModel):
+class ListContainerStatsInput(ResponseFormatInput):
+    all: bool = Field(
+        False, description="Include stopped containers (default shows just running)"
+    )
+    filters: ListContainersFilters | None = Field(None, description="Filter containers")
+    wait: float = Field(
+        3.0,
+        ge=0,
+        le=30,
+        exclude=True,
+        description="Seconds to wait for the first samples of containers whose stats weren't being collected yet",
+    )
+
+
+class ContainerSpec(JSONParsingModel):
     """
-    Schema for creating a new container.
+    Schema for the settings of a container.
 
     This is passed to the Python Docker SDK directly, so the fields are the same
     as the `docker.containers.create` method.
     """
 
-    detach: bool = Field(
-        True,
-        description="Run container in the background. Should be True for long-running containers, can be false for short-lived containers",
-    )
     image: str = Field(..., description="Docker image name")
     name: str | None = Field(None, description="Container name")
     entrypoint: str | None = Field(None, description="Entrypoint to run in container")
@@ -110,11 +281,36 @@ class CreateContainerInput(JSONParsingModel):
     auto_remove: bool = Field(False, description="Automatically remove the container")
 
 
+class CreateContainerInput(ContainerSpec, HostInput):
+    """Schema for creating a new container."""
+
+    detach: bool = Field(
+        True,
+        description="Run container in the background. Should be True for long-running containers, can be false for short-lived containers",
+    )
+
+
 class RecreateContainerInput(CreateContainerInput):
     container_id: str | None = Field(
         None,
         description="Container ID to recreate. The `name` parameter will be used if this is not provided",
     )
+    stop_timeout: int | None = Field(
+        None,
+        ge=0,
+        exclude=True,
+        description="Seconds to wait for the old container to stop before killing it. Defaults to its stop timeout (10 unless configured)",
+    )
+    pull: bool = Field(
+        False,
+        exclude=True,
+        description="Pull the image even if present, e.g. to update a `latest` tag",
+    )
+    force: bool = Field(
+        False,
+        exclude=True,
+        description="Recreate the container even if its configuration is unchanged",
+    )
 
     @computed_field
     @property
@@ -130,15 +326,47 @@ class RecreateContainerInput(CreateContainerInput):
         return self
 
 
-class ContainerActionInput(JSONParsingModel):
+class ContainerActionInput(HostInput):
     container_id: str = Field(..., description="Container ID or name")
 
 
-class RemoveContainerInput(JSONParsingModel):
+class RemoveContainerInput(HostInput):
     container_id: str = Field(..., description="Container ID or name")
     force: bool = Field(False, description="Force remove the container")
 
 
+class BulkContainerActionInput(HostInput):
+    container_ids: list[str] | None = Field(
+        None, description="IDs or names of the containers"
+    )
+    filters: ListContainersFilters | None = Field(
+        None,
+        description="Select the containers matching these filters, stopped ones included, instead of giving `container_ids`",
+    )
+    depends_on: dict[str, list[str]] | None = Field(
+        None,
+        description="Maps a container to the containers it depends on. Containers are started after their dependencies, and stopped or removed before them; independent containers are handled in parallel. Refer to containers by ID or name; all must be among the selected containers",
+    )
+
+    @model_validator(mode="after")
+    def validate_selection(self):
+        if (self.container_ids is None) == (self.filters is None):
+            raise ValueError("Exactly one of container_ids or filters is required")
+        return self
+
+
+class BulkStopContainersInput(BulkContainerActionInput):
+    timeout: int | None = Field(
+        None,
+        ge=0,
+        description="Seconds to wait for each container to stop before killing it. Defaults to the stop timeout of the container (10 unless configured)",
+    )
+
+
+class BulkRemoveContainersInput(BulkContainerActionInput):
+    force: bool = Field(False, description="Force remove running containers")
+
+
 class ListImagesFilters(JSONParsingModel):
     dangling: bool | None = Field(None, description="Show dangling images")
     label: list[str] | None = Field(
@@ -146,7 +374,7 @@ class ListImagesFilters(JSONParsingModel):
     )
 
 
-class ListImagesInput(JSONParsingModel):
+class ListImagesInput(ListInput):
     name: str | None = Field(
         None, description="Filter images by repository name, if desired"
     )
@@ -154,18 +382,42 @@ class ListImagesInput(JSONParsingModel):
     filters: ListImagesFilters | None = Field(None, description="Filter images")
 
 
-class PullPushImageInput(JSONParsingModel):
+class PullPushImageInput(HostInput):
     repository: str = Field(..., description="Image repository")
     tag: str | None = Field("latest", description="Image tag")
 
 
-class BuildImageInput(JSONParsingModel):
+class PullImagesInput(HostInput):
+    references: list[str] = Field(
+        ...,
+        min_length=1,
+        description="Image references to pull, e.g. `nginx`, `nginx:1.27` or `nginx@sha256:...`. Without a tag, `latest` is pulled",
+    )
+
+
+class BuildImageInput(HostInput):
     path: str = Field(..., description="Path to build context")
     tag: str = Field(..., description="Image tag")
     dockerfile: str | None = Field(None, description="Path to Dockerfile")
+    buildargs: dict[str, str] | None = Field(
+        None, description="Build-time variables, for `ARG` instructions"
+    )
+    target: str | None = Field(
+        None, description="Stage to build in a multi-stage Dockerfile"
+    )
+    pull: bool = Field(False, description="Pull newer versions of the base images")
+    cache_from: list[str] | None = Field(
+        None, description="Images to use as cache sources"
+    )
+    log_tail: int = Field(
+        50,
+        ge=0,
+        exclude=True,
+        description="Number of lines of build output to return. The full output is streamed as progress notifications",
+    )
 
 
-class RemoveImageInput(JSONParsingModel):
+class RemoveImageInput(HostInput):
     image: str = Field(..., description="Image ID or name")
     force: bool = Field(False, description="Force remove the image")
 
@@ -176,36 +428,91 @@ class ListNetworksFilter(JSONParsingModel):
     )
 
 
-class ListNetworksInput(JSONParsingModel):
+class ListNetworksInput(ListInput):
     filters: ListNetworksFilter | None = Field(None, description="Filter networks")
 
 
-class CreateNetworkInput(JSONParsingModel):
+class NetworkSpec(JSONParsingModel):
     name: str = Field(..., description="Network name")
     driver: str | None = Field("bridge", description="Network driver")
     internal: bool = Field(False, description="Create an internal network")
     labels: dict[str, str] | None = Field(None, description="Network labels")
 
 
-class RemoveNetworkInput(JSONParsingModel):
+class CreateNetworkInput(NetworkSpec, HostInput):
+    pass
+
+
+class RemoveNetworkInput(HostInput):
     network_id: str = Field(..., description="Network ID or name")
 
 
-class ListVolumesInput(JSONParsingModel):
+class ListVolumesInput(ListInput):
     pass
 
 
-class CreateVolumeInput(JSONParsingModel):
+class VolumeSpec(JSONParsingModel):
     name: str = Field(..., description="Volume name")
     driver: str | None = Field("local", description="Volume driver")
     labels: dict[str, str] | None = Field(None, description="Volume labels")
 
 
-class RemoveVolumeInput(JSONParsingModel):
+class CreateVolumeInput(VolumeSpec, HostInput):
+    pass
+
+
+class RemoveVolumeInput(HostInput):
     volume_name: str = Field(..., description="Volume name")
     force: bool = Field(False, description="Force remove the volume")
 
 
+class ProjectContainerSpec(ContainerSpec):
+    name: str = Field(..., description="Container name")
+    depends_on: list[str] | None = Field(
+        None,
+        exclude=True,
+        description="Names of the project's containers that must be up before this one",
+    )
+
+
+class ApplyProjectInput(HostInput):
+    """
+    The desired state of a project: its containers, networks and volumes. They
+    are labeled with the project, and any project object missing from the
+    desired state is an orphan.
+    """
+
+    project: str = Field(..., description="Project name")
+    containers: list[ProjectContainerSpec] = Field(
+        default_factory=list, description="The project's containers"
+    )
+    networks: list[NetworkSpec] = Field(
+        default_factory=list, description="The project's networks"
+    )
+    volumes: list[VolumeSpec] = Field(
+        default_factory=list, description="The project's volumes"
+    )
+    remove_orphans: bool = Field(
+        False,
+        description="Remove the project's containers, networks and volumes that aren't in the desired state",
+    )
+    dry_run: bool = Field(
+        False, description="Only return the plan, without applying it"
+    )
+
+    @model_validator(mode="after")
+    def validate_names(self):
+        for kind, specs in (
+            ("container", self.containers),
+            ("network", self.networks),
+            ("volume", self.volumes),
+        ):
+            names = [spec.name for spec in specs]
+            if len(set(names)) != len(names):
+                raise ValueError(f"Duplicate {kind} names")
+        return self
+
+
 class DockerComposePromptInput(BaseModel):
     name: str
     containers: str
@@ -0,0 +1,161 @@
+import json
+import logging
+import threading
+import time
+from collections.abc import Callable
+from typing import Any, Literal
+
+import docker
+
+logger = logging.getLogger(__name__)
+
+Kind = Literal["container", "image", "network", "volume"]
+KINDS: tuple[Kind, ...] = ("container", "image", "network", "volume")
+
+
+class InventoryCache:
+    """
+    In-process cache of Docker list endpoint responses and container inspections.
+
+    Entries expire after `ttl` seconds, and are invalidated as soon as the
+    Docker events stream reports a change to an object of the same kind (or,
+    for inspections, to that very container). Cached values are shared between
+    callers, so they must not be mutated.
+    """
+
+    def __init__(self, client: docker.DockerClient, ttl: float):
+        self._client = client
+        self._ttl = ttl
+        self._lock = threading.Lock()
+        # (kind, key) -> (expiry as monotonic time, value)
+        self._entries: dict[tuple[Kind, str], tuple[float, Any]] = {}
+        # Bumped on every invalidation, so that a load racing with an
+        # invalidation doesn't store a stale value
+        self._generations: dict[Kind, int] = {kind: 0 for kind in KINDS}
+        self._hits = 0
+        self._misses = 0
+
+        self._stopped = threading.Event()
+        self._events: Any = None
+        self._watcher: threading.Thread | None = None
+
+    @property
+    def enabled(self) -> bool:
+        return self._ttl > 0
+
+    def list[T](self, kind: Kind, load: Callable[..., T], **kwargs: Any) -> T:
+        """Return the cached result of `load(**kwargs)`, a call to a list endpoint."""
+        key = "list:" + json.dumps(kwargs, sort_keys=True, default=str)
+        return self._get(kind, key, lambda: load(**kwargs))
+
+    def inspect_container[T](self, container_id: str, load: Callable[[str], T]) -> T:
+        """Return the cached result of `load(container_id)`, given a full container ID."""
+        return self._get(
+            "container", "inspect:" + container_id, lambda: load(container_id)
+        )
+
+    def invalidate(self, kind: Kind | None = None, object_id: str | None = None):
+        """
+        Drop the cached listings of `kind` (of every kind if None). If
+        `object_id` is given, the inspection of that container is dropped too.
+        """
+        kinds = KINDS if kind is None else (kind,)
+        with self._lock:
+            for k in kinds:
+                self._generations[k] += 1
+            self._entries = {
+                (k, key): entry
+                for (k, key), entry in self._entries.items()
+                if not (
+                    k in kinds
+                    and (
+                        key.startswith("list:")
+                        or kind is None
+                        or key == f"inspect:{object_id}"
+                    )
+                )
+            }
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "ttl": self._ttl,
+                "entries": len(self._entries),
+                "hits": self._hits,
+                "misses": self._misses,
+                "watching_events": self._events is not None,
+            }
+
+    def start(self):
+        """Watch Docker events in a background thread to invalidate entries."""
+        if not self.enabled or self._watcher is not None:
+            return
+        self._watcher = threading.Thread(
+            target=self._watch_events, name="docker-events", daemon=True
+        )
+        self._watcher.start()
+
+    def stop(self):
+        self._stopped.set()
+        events = self._events
+        if events is not None:
+            events.close()
+
+    def _get[T](self, kind: Kind, key: str, load: Callable[[], T]) -> T:
+        if not self.enabled:
+            return load()
+
+        with self._lock:
+            entry = self._entries.get((kind, key))
+            if entry is not None and entry[0] > time.monotonic():
+                self._hits += 1
+                return entry[1]
+            self._misses += 1
+            generation = self._generations[kind]
+
+        value = load()
+
+        with self._lock:
+            if self._generations[kind] == generation:
+                self._entries[(kind, key)] = (time.monotonic() + self._ttl, value)
+        return value
+
+    def _watch_events(self):
+        backoff = 1.0
+        while not self._stopped.is_set():
+            try:
+                self._events = self._client.events(
+                    decode=True, filters={"type": list(KINDS)}
+                )
+                # Events may have been missed while (re)connecting
+                self.invalidate()
+                backoff = 1.0
+                for event in self._events:
+                    self._apply_event(event)
+            except Exception:
+                if not self._stopped.is_set():
+                    logger.warning(
+                        "Docker events stream failed, cached entries will only expire by TTL",
+                        exc_info=True,
+                    )
+            finally:
+                self._events = None
+
+            self._stopped.wait(backoff)
+            backoff = min(backoff * 2, 30.0)
+
+    def _apply_event(self, event: dict[str, Any]):
+        kind = event.get("Type")
+        actor = event.get("Actor") or {}
+
+        if kind == "container":
+            self.invalidate("container", actor.get("ID"))
+        elif kind == "network":
+            self.invalidate("network")
+            # (Dis)connecting a container changes its inspection and its listing
+            container_id = (actor.get("Attributes") or {}).get("container")
+            if container_id:
+                self.invalidate("container", container_id)
+        elif kind in ("image", "volume"):
+            self.invalidate(kind)
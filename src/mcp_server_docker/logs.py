@@ -0,0 +1,193 @@
+import codecs
+import re
+import secrets
+import threading
+from collections import OrderedDict, deque
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass
+from datetime import UTC, datetime
+from typing import Literal
+
+from docker.models.containers import Container
+
+# Docker prefixes each line with an RFC 3339 timestamp with up to nanosecond precision
+_TIMESTAMP = re.compile(r"^(\S+?)(?:\.(\d{1,9}))?(Z|[+-]\d\d:\d\d) ")
+
+
+@dataclass(frozen=True)
+class LogPosition:
+    """How far a client has read the logs of a container."""
+
+    container_id: str
+    # Timestamp of the newest line read, in nanoseconds since the epoch
+    timestamp: int | None
+    # How many lines read carry exactly that timestamp
+    lines_at_timestamp: int = 0
+
+
+class LogCursors:
+    """Opaque cursors into container logs, evicting the least recently used beyond `capacity`."""
+
+    def __init__(self, capacity: int):
+        self._capacity = capacity
+        self._positions: OrderedDict[str, LogPosition] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, cursor: str) -> LogPosition:
+        with self._lock:
+            position = self._positions.get(cursor)
+            if position is None:
+                raise ValueError(
+                    f"Unknown or expired log cursor: {cursor}. Fetch the logs again without a cursor"
+                )
+            self._positions.move_to_end(cursor)
+            return position
+
+    def issue(self, position: LogPosition) -> str:
+        cursor = secrets.token_urlsafe(12)
+        with self._lock:
+            self._positions[cursor] = position
+            while len(self._positions) > self._capacity:
+                self._positions.popitem(last=False)
+        return cursor
+
+
+def _split_timestamp(line: str) -> tuple[int | None, str]:
+    match = _TIMESTAMP.match(line)
+    if match is None:
+        return None, line
+
+    seconds = datetime.fromisoformat(match.group(1) + match.group(3))
+    nanos = int((match.group(2) or "0").ljust(9, "0"))
+    return int(seconds.timestamp()) * 1_000_000_000 + nanos, line[match.end() :]
+
+
+class _PositionTracker:
+    """Strips timestamps from lines, skipping lines already read and tracking the newest one."""
+
+    def __init__(self, start: LogPosition):
+        self.position = start
+
+    def filter(self, lines: Iterable[str]) -> Iterator[str]:
+        start = self.position
+        skip = start.lines_at_timestamp
+        for line in lines:
+            timestamp, text = _split_timestamp(line)
+            if timestamp is not None and start.timestamp is not None:
+                if timestamp < start.timestamp:
+                    continue
+                if timestamp == start.timestamp and skip > 0:
+                    skip -= 1
+                    continue
+
+            if timestamp is not None:
+                current = self.position
+                self.position = LogPosition(
+                    current.container_id,
+                    timestamp,
+                    current.lines_at_timestamp + 1
+                    if timestamp == current.timestamp
+                    else 1,
+                )
+            yield text
+
+
+def iter_lines(chunks: Iterable[bytes]) -> Iterator[str]:
+    """
+    Split a stream of log chunks into lines, decoding UTF-8 incrementally.
+
+    Invalid UTF-8 is replaced rather than raising, and a chunk boundary may fall
+    anywhere, including in the middle of a multi-byte character.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    pending = ""
+    for chunk in chunks:
+        pending += decoder.decode(chunk)
+        *lines, pending = pending.split("\n")
+        yield from lines
+
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending
+
+
+def tail_lines(
+    lines: Iterable[str], max_lines: int | None, max_bytes: int | None
+) -> tuple[list[str], int]:
+    """
+    Keep the newest `lines` within the line and byte budgets.
+
+    Returns the kept lines and the number of (older) lines dropped.
+    """
+    kept: deque[tuple[str, int]] = deque()
+    size = 0
+    dropped = 0
+    for line in lines:
+        line_size = len(line.encode("utf-8")) + 1
+        kept.append((line, line_size))
+        size += line_size
+
+        while (max_lines is not None and len(kept) > max_lines) or (
+            max_bytes is not None and size > max_bytes and len(kept) > 1
+        ):
+            _, oldest_size = kept.popleft()
+            size -= oldest_size
+            dropped += 1
+
+    return [line for line, _ in kept], dropped
+
+
+def fetch_logs(
+    container: Container,
+    *,
+    tail: int | Literal["all"] = 100,
+    since: datetime | None = None,
+    until: datetime | None = None,
+    stdout: bool = True,
+    stderr: bool = True,
+    grep: str | None = None,
+    max_lines: int | None = None,
+    max_bytes: int | None = None,
+    after: LogPosition | None = None,
+) -> tuple[list[str], LogPosition]:
+    """
+    Stream the logs of a container, keeping only the newest lines that match
+    `grep` within the line and byte budgets.
+
+    Memory is bounded by the budgets rather than by the size of the logs. If
+    lines were dropped to stay within budget, the first line is a marker saying
+    how many.
+
+    If `after` is given, only lines newer than that position are returned and
+    `tail` is ignored. The position of the newest line read (matching `grep`
+    or not) is returned alongside the lines.
+    """
+    pattern = re.compile(grep) if grep is not None else None
+
+    if after is not None:
+        if after.container_id != container.id:
+            raise ValueError("The log cursor belongs to another container")
+        tail = "all"
+        if after.timestamp is not None:
+            # Whole seconds, as lines at the same timestamp are skipped by the tracker
+            since = datetime.fromtimestamp(after.timestamp // 1_000_000_000, UTC)
+
+    chunks = container.logs(
+        stream=True,
+        follow=False,
+        timestamps=True,
+        tail=tail,
+        since=since,
+        until=until,
+        stdout=stdout,
+        stderr=stderr,
+    )
+    tracker = _PositionTracker(after or LogPosition(container.id, None))
+    lines = tracker.filter(iter_lines(chunks))
+    if pattern is not None:
+        lines = (line for line in lines if pattern.search(line))
+
+    kept, dropped = tail_lines(lines, max_lines, max_bytes)
+    if dropped:
+        kept.insert(0, f"[... {dropped} earlier lines truncated ...]")
+    return kept, tracker.position
@@ -0,0 +1,48 @@
+"""
+Generates `tool_manifest.json`, the MCP definitions of the tools from which
+`app` answers `list_tools` without importing the Docker SDK or building the
+tools' JSON schemas.
+
+Regenerate the manifest whenever a tool or its inputs change:
+
+    python -m mcp_server_docker.manifest
+
+and check that it's up to date with `--check`.
+"""
+
+import argparse
+import json
+import sys
+from typing import Any
+
+from .app import MANIFEST_PATH
+from .server import _tools
+
+
+def build_manifest() -> list[dict[str, Any]]:
+    """The definitions of the tools, generated from their input models."""
+    return [
+        tool.model_dump(mode="json", exclude_none=True) for tool in _tools.definitions
+    ]
+
+
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(description="Generate the tool manifest")
+    parser.add_argument(
+        "--check",
+        action="store_true",
+        help="Fail if the manifest is out of date instead of writing it",
+    )
+    args = parser.parse_args(argv)
+
+    manifest = json.dumps(build_manifest(), indent=2) + "\n"
+    if not args.check:
+        MANIFEST_PATH.write_text(manifest)
+    elif not MANIFEST_PATH.exists() or MANIFEST_PATH.read_text() != manifest:
+        sys.exit(
+            f"{MANIFEST_PATH.name} is out of date, run `python -m mcp_server_docker.manifest`"
+        )
+
+
+if __name__ == "__main__":
+    main()
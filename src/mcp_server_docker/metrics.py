@@ -0,0 +1,274 @@
+import bisect
+import contextlib
+import threading
+import time
+from collections import defaultdict, deque
+from collections.abc import Callable, Iterator, Mapping
+from contextvars import ContextVar, copy_context
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any
+
+_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+_CALL_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+_SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+
+class Histogram:
+    """Counts of observed values in fixed buckets, like a Prometheus histogram."""
+
+    def __init__(self, buckets: tuple[float, ...]):
+        self.buckets = buckets
+        # One count per bucket, plus one for values above the last bucket
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def quantile(self, q: float) -> float:
+        """Estimate a quantile as the upper bound of the bucket it falls in."""
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return round(min(bound, self.max), 4)
+        return round(self.max, 4)
+
+    def summary(self) -> dict[str, float]:
+        if not self.count:
+            return {"count": 0}
+        return {
+            "count": self.count,
+            "mean": round(self.sum / self.count, 4),
+            "p50": self.quantile(0.5),
+            "p90": self.quantile(0.9),
+            "p99": self.quantile(0.99),
+            "max": round(self.max, 4),
+        }
+
+    def prometheus(self, name: str, labels: str) -> list[str]:
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+        lines += [
+            f'{name}_bucket{{{labels},le="+Inf"}} {self.count}',
+            f"{name}_sum{{{labels}}} {self.sum}",
+            f"{name}_count{{{labels}}} {self.count}",
+        ]
+        return lines
+
+
+@dataclass
+class Invocation:
+    """A tool call being handled, to which Docker API calls are attributed."""
+
+    tool: str
+    started: float
+    outcome: str = "ok"
+    docker_calls: int = 0
+    response_bytes: int = 0
+
+
+@dataclass
+class _ToolMetrics:
+    outcomes: defaultdict[str, int]
+    latency: Histogram
+    docker_calls: Histogram
+    response_bytes: Histogram
+
+
+_invocation: ContextVar[Invocation | None] = ContextVar("invocation", default=None)
+
+
+def in_context[**P, T](func: Callable[P, T]) -> Callable[P, T]:
+    """
+    Wrap `func` to run in (a copy of) the current context, even from another
+    thread, so that Docker API calls it makes from a thread pool are still
+    attributed to the tool call, and it can report progress.
+    """
+    context = copy_context()
+
+    def run(*args: P.args, **kwargs: P.kwargs) -> T:
+        # A context can't be entered by several threads at once
+        return context.copy().run(func, *args, **kwargs)
+
+    return run
+
+
+class Metrics:
+    """
+    Request-level metrics of the server: the latency, outcome, number of Docker
+    API calls and response size of every tool call, and the Docker API calls
+    made outside of tool calls (e.g. by resources and background streams).
+
+    The last `recent` tool calls are kept as is, to trace slow calls.
+    """
+
+    def __init__(self, recent: int = 20):
+        self._lock = threading.Lock()
+        self._tools: dict[str, _ToolMetrics] = {}
+        # (host, tool) -> count, with an empty tool for calls made outside tool calls
+        self._docker_calls: defaultdict[tuple[str, str], int] = defaultdict(int)
+        self._recent: deque[dict[str, Any]] = deque(maxlen=recent)
+
+    @contextlib.contextmanager
+    def tool_call(self, tool: str) -> Iterator[Invocation]:
+        """Measure a tool call, which the caller may mark as failed or size."""
+        invocation = Invocation(tool, time.monotonic())
+        token = _invocation.set(invocation)
+        try:
+            yield invocation
+        except BaseException:
+            invocation.outcome = "error"
+            raise
+        finally:
+            _invocation.reset(token)
+            self._record(invocation, time.monotonic() - invocation.started)
+
+    def docker_call_hook(self, host: str) -> Callable[..., None]:
+        """A `requests` response hook counting the Docker API calls made to `host`."""
+
+        def count(response: Any, *args: Any, **kwargs: Any) -> None:
+            invocation = _invocation.get()
+            with self._lock:
+                self._docker_calls[host, invocation.tool if invocation else ""] += 1
+                if invocation is not None:
+                    invocation.docker_calls += 1
+
+        return count
+
+    def snapshot(self, caches: Mapping[str, Mapping[str, Any]]) -> dict[str, Any]:
+        """The metrics as a JSON-serializable dict, with the stats of the hosts' caches."""
+        with self._lock:
+            tools = {
+                name: {
+                    "calls": dict(tool.outcomes),
+                    "latency_seconds": tool.latency.summary(),
+                    "docker_api_calls": tool.docker_calls.summary(),
+                    "response_bytes": tool.response_bytes.summary(),
+                }
+                for name, tool in sorted(self._tools.items())
+            }
+            docker_calls: dict[str, dict[str, int]] = defaultdict(dict)
+            for (host, tool), count in sorted(self._docker_calls.items()):
+                docker_calls[host][tool or "(outside tool calls)"] = count
+            recent = list(self._recent)
+
+        return {
+            "tools": tools,
+            "docker_api_calls": docker_calls,
+            "cache": {host: _hit_rate(stats) for host, stats in caches.items()},
+            "recent_tool_calls": recent,
+        }
+
+    def prometheus(self, caches: Mapping[str, Mapping[str, Any]]) -> str:
+        """The metrics in the Prometheus text exposition format."""
+        prefix = "mcp_server_docker"
+        lines = [f"# TYPE {prefix}_tool_calls_total counter"]
+        with self._lock:
+            tools = sorted(self._tools.items())
+            for name, tool in tools:
+                for outcome, count in sorted(tool.outcomes.items()):
+                    lines.append(
+                        f'{prefix}_tool_calls_total{{tool="{name}",outcome="{outcome}"}} {count}'
+                    )
+            # The samples of a metric must be grouped together
+            for metric, attr in (
+                ("tool_duration_seconds", "latency"),
+                ("tool_docker_api_calls", "docker_calls"),
+                ("tool_response_bytes", "response_bytes"),
+            ):
+                lines.append(f"# TYPE {prefix}_{metric} histogram")
+                for name, tool in tools:
+                    lines += getattr(tool, attr).prometheus(
+                        f"{prefix}_{metric}", f'tool="{name}"'
+                    )
+
+            lines.append(f"# TYPE {prefix}_docker_api_calls_total counter")
+            for (host, tool), count in sorted(self._docker_calls.items()):
+                lines.append(
+                    f'{prefix}_docker_api_calls_total{{host="{host}",tool="{tool}"}} {count}'
+                )
+
+        for counter in ("hits", "misses"):
+            lines.append(f"# TYPE {prefix}_cache_{counter}_total counter")
+            for host, stats in sorted(caches.items()):
+                lines.append(
+                    f'{prefix}_cache_{counter}_total{{host="{host}"}} {stats[counter]}'
+                )
+        return "\n".join(lines) + "\n"
+
+    def _record(self, invocation: Invocation, elapsed: float):
+        with self._lock:
+            tool = self._tools.get(invocation.tool)
+            if tool is None:
+                tool = self._tools[invocation.tool] = _ToolMetrics(
+                    defaultdict(int),
+                    Histogram(_LATENCY_BUCKETS),
+                    Histogram(_CALL_COUNT_BUCKETS),
+                    Histogram(_SIZE_BUCKETS),
+                )
+            tool.outcomes[invocation.outcome] += 1
+            tool.latency.observe(elapsed)
+            tool.docker_calls.observe(invocation.docker_calls)
+            if invocation.outcome == "ok":
+                tool.response_bytes.observe(invocation.response_bytes)
+            self._recent.append(
+                {
+                    "tool": invocation.tool,
+                    "outcome": invocation.outcome,
+                    "seconds": round(elapsed, 4),
+                    "docker_api_calls": invocation.docker_calls,
+                    "response_bytes": invocation.response_bytes,
+                }
+            )
+
+
+def _hit_rate(stats: Mapping[str, Any]) -> dict[str, Any]:
+    lookups = stats["hits"] + stats["misses"]
+    return {
+        "hits": stats["hits"],
+        "misses": stats["misses"],
+        "hit_rate": round(stats["hits"] / lookups, 4) if lookups else None,
+    }
+
+
+def serve_prometheus(
+    render: Callable[[], str], host: str, port: int
+) -> ThreadingHTTPServer:
+    """Serve the output of `render` at `/metrics`, for Prometheus to scrape, in a background thread."""
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?", 1)[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = render().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format: str, *args: Any):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    threading.Thread(
+        target=server.serve_forever, name="prometheus-metrics", daemon=True
+    ).start()
+    return server
+
+
+# The metrics of the process, shared by all sessions and hosts
+metrics = Metrics()
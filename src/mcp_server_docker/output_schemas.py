@@ -1,3 +1,5 @@
+from collections.abc import Mapping
+from datetime import UTC, datetime
 from typing import Any
 
 from docker.models.containers import Container
@@ -6,9 +8,38 @@ from docker.models.networks import Network
 from docker.models.volumes import Volume
 
 
+def _created(value: Any) -> Any:
+    # The list endpoint reports image creation as a UNIX timestamp, while
+    # inspecting an image gives an RFC 3339 string
+    if isinstance(value, int):
+        return datetime.fromtimestamp(value, UTC).strftime("%Y-%m-%dT%H:%M:%SZ")
+    return value
+
+
+def _container_image(
+    container: Container, images: Mapping[str, Image] | None
+) -> Image | None:
+    if images is None:
+        # Costs an extra API call to inspect the image
+        return container.image
+
+    # Inspected containers carry the image ID in `Image`, listed ones in `ImageID`
+    image_id = container.attrs.get("ImageID", container.attrs.get("Image"))
+    return images.get(image_id) if image_id else None
+
+
 def docker_to_dict(
-    obj: Image | Container | Volume | Network, overrides: dict[str, Any] | None = None
+    obj: Image | Container | Volume | Network,
+    overrides: dict[str, Any] | None = None,
+    *,
+    images: Mapping[str, Image] | None = None,
 ) -> dict[str, Any]:
+    """
+    Serialize a Docker object for the LLM.
+
+    For containers, pass `images` (image ID to image) to resolve the container's
+    image from it rather than inspecting the image with a separate API call.
+    """
     result = None
 
     if isinstance(obj, Image):
@@ -18,21 +49,23 @@ def docker_to_dict(
             "id": obj.id,
             "tags": obj.tags,
             "short_id": obj.short_id,
-            "labels": img_config.get("Labels", {}),
+            # Listed images have no `Config`, but report the labels at the top level
+            "labels": img_config.get("Labels", obj.attrs.get("Labels", {})),
             "repo_tags": obj.attrs.get("RepoTags"),
             "repo_digests": obj.attrs.get("RepoDigests"),
-            "created": obj.attrs.get("Created"),
+            "created": _created(obj.attrs.get("Created")),
             "size": obj.attrs.get("Size"),
         }
 
     if isinstance(obj, Container):
         config: dict[str, Any] = obj.attrs.get("Config") or {}
+        image = _container_image(obj, images)
 
         result = {
             "id": obj.id,
             "name": obj.name,
             "short_id": obj.short_id,
-            "image": docker_to_dict(obj.image) if obj.image else None,
+            "image": docker_to_dict(image) if image else None,
             "status": obj.status,
             "labels": config.get("Labels", {}),
             "ports": obj.ports,
@@ -77,3 +110,116 @@ def docker_to_dict(
         raise ValueError(f"Unsupported object type: {type(obj)}")
 
     return result if overrides is None else {**result, **overrides}
+
+
+def docker_to_summary_dict(obj: Image | Container | Volume | Network) -> dict[str, Any]:
+    """
+    Serialize a Docker object as returned by its list endpoint, without any
+    fields that require inspecting the object (e.g. `containers.list(sparse=True)`).
+    """
+    result = None
+
+    if isinstance(obj, Image):
+        result = {
+            "id": obj.id,
+            "short_id": obj.short_id,
+            "tags": obj.attrs.get("RepoTags") or [],
+            "created": _created(obj.attrs.get("Created")),
+            "size": obj.attrs.get("Size"),
+        }
+
+    if isinstance(obj, Container):
+        names: list[str] = obj.attrs.get("Names") or []
+
+        result = {
+            "id": obj.id,
+            "name": names[0].lstrip("/") if names else None,
+            "short_id": obj.short_id,
+            "image": obj.attrs.get("Image"),
+            "status": obj.attrs.get("State"),
+            "labels": obj.attrs.get("Labels") or {},
+            "created": _created(obj.attrs.get("Created")),
+        }
+
+    if isinstance(obj, Network):
+        result = {
+            "id": obj.id,
+            "name": obj.name,
+            "driver": obj.attrs.get("Driver"),
+            "scope": obj.attrs.get("Scope"),
+            "labels": obj.attrs.get("Labels"),
+        }
+
+    if isinstance(obj, Volume):
+        result = {
+            "name": obj.name,
+            "driver": obj.attrs.get("Driver"),
+            "labels": obj.attrs.get("Labels") or {},
+            "created": obj.attrs.get("CreatedAt"),
+        }
+
+    if result is None:
+        raise ValueError(f"Unsupported object type: {type(obj)}")
+
+    return result
+
+
+def _published_ports(ports: list[dict[str, Any]] | None) -> list[str]:
+    # Ports published on both IPv4 and IPv6 are listed twice
+    return sorted(
+        {
+            f"{port['PublicPort']}:{port['PrivatePort']}/{port['Type']}"
+            if port.get("PublicPort")
+            else f"{port['PrivatePort']}/{port['Type']}"
+            for port in ports or []
+        }
+    )
+
+
+def _mount(mount: dict[str, Any]) -> str:
+    source = mount.get("Name") or mount.get("Source")
+    mode = "" if mount.get("RW", True) else ":ro"
+    return f"{source}:{mount.get('Destination')}{mode}"
+
+
+def docker_to_plan_dict(obj: Container | Volume | Network) -> dict[str, Any]:
+    """
+    Serialize a listed Docker object with only the fields needed to plan
+    changes to it, leaving out empty ones. Unlike `docker_to_dict`, this needs
+    neither the object nor its image inspected.
+    """
+    result = None
+
+    if isinstance(obj, Container):
+        names: list[str] = obj.attrs.get("Names") or []
+        networks = (obj.attrs.get("NetworkSettings") or {}).get("Networks") or {}
+
+        result = {
+            "name": names[0].lstrip("/") if names else obj.short_id,
+            "image": obj.attrs.get("Image"),
+            "status": obj.attrs.get("State"),
+            "ports": _published_ports(obj.attrs.get("Ports")),
+            "volumes": sorted(_mount(m) for m in obj.attrs.get("Mounts") or []),
+            "networks": sorted(networks),
+        }
+
+    if isinstance(obj, Network):
+        result = {"name": obj.name, "driver": obj.attrs.get("Driver")}
+
+    if isinstance(obj, Volume):
+        result = {"name": obj.name, "driver": obj.attrs.get("Driver")}
+
+    if result is None:
+        raise ValueError(f"Unsupported object type: {type(obj)}")
+
+    return {key: value for key, value in result.items() if value}
+
+
+def select_fields(
+    items: list[dict[str, Any]], fields: list[str] | None
+) -> list[dict[str, Any]]:
+    """Keep only the given fields of each serialized object (all of them if `fields` is None)."""
+    if fields is None:
+        return items
+
+    return [{field: item[field] for field in fields if field in item} for item in items]
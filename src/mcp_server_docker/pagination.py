@@ -0,0 +1,50 @@
+import base64
+import binascii
+from bisect import bisect_right
+from collections.abc import Callable, Sequence
+from dataclasses import dataclass
+
+
+@dataclass
+class Page[T]:
+    items: list[T]
+    total: int
+    next_cursor: str | None
+
+
+def encode_cursor(key: str) -> str:
+    return base64.urlsafe_b64encode(key.encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor: str) -> str:
+    try:
+        raw = base64.b64decode(cursor.encode("ascii"), altchars=b"-_", validate=True)
+        return raw.decode("utf-8")
+    except (binascii.Error, UnicodeError):
+        raise ValueError(f"Invalid cursor: {cursor}") from None
+
+
+def paginate[T](
+    items: Sequence[T],
+    key: Callable[[T], str],
+    limit: int | None,
+    cursor: str | None,
+) -> Page[T]:
+    """
+    Return the page of `items` following `cursor`, ordered by `key`.
+
+    A cursor encodes the key of the last item of the previous page rather than
+    an offset, so that pages stay consistent when objects are created or
+    removed between calls.
+    """
+    ordered = sorted(items, key=key)
+
+    start = 0
+    if cursor is not None:
+        start = bisect_right(ordered, decode_cursor(cursor), key=key)
+
+    end = len(ordered) if limit is None else min(start + limit, len(ordered))
+    page = ordered[start:end]
+
+    next_cursor = encode_cursor(key(page[-1])) if page and end < len(ordered) else None
+    return Page(items=page, total=len(ordered), next_cursor=next_cursor)
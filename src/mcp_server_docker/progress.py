@@ -0,0 +1,100 @@
+import asyncio
+import contextlib
+import threading
+import time
+from collections.abc import Iterator
+from contextvars import ContextVar
+from typing import Any
+
+from mcp.server.session import ServerSession
+from mcp.shared.context import RequestContext
+
+# Minimum seconds between two progress notifications of a request
+_MIN_INTERVAL = 0.1
+
+_current: ContextVar["ProgressReporter | None"] = ContextVar(
+    "progress_reporter", default=None
+)
+
+
+class ProgressReporter:
+    """
+    Sends the progress of a request as MCP progress notifications, from the
+    worker threads handling it.
+
+    Notifications are throttled, except the one reporting completion (or
+    flagged `final`, when the total isn't known), and only sent when progress
+    increases, as clients expect.
+    """
+
+    def __init__(
+        self,
+        session: ServerSession,
+        token: str | int,
+        request_id: str | int,
+        loop: asyncio.AbstractEventLoop,
+    ):
+        self._session = session
+        self._token = token
+        self._request_id = request_id
+        self._loop = loop
+        self._lock = threading.Lock()
+        self._progress: float | None = None
+        self._sent = 0.0
+
+    @classmethod
+    def for_request(
+        cls, context: RequestContext[ServerSession, Any]
+    ) -> "ProgressReporter | None":
+        """A reporter for the request, if the client asked for progress."""
+        token = context.meta.progressToken if context.meta else None
+        if token is None:
+            return None
+        return cls(
+            context.session, token, context.request_id, asyncio.get_running_loop()
+        )
+
+    def report(
+        self,
+        progress: float,
+        total: float | None = None,
+        message: str | None = None,
+        final: bool = False,
+    ):
+        now = time.monotonic()
+        with self._lock:
+            done = final or (total is not None and progress >= total)
+            if (self._progress is not None and progress <= self._progress) or (
+                not done and now - self._sent < _MIN_INTERVAL
+            ):
+                return
+            self._progress, self._sent = progress, now
+
+        asyncio.run_coroutine_threadsafe(
+            self._session.send_progress_notification(
+                self._token,
+                progress,
+                total,
+                message,
+                related_request_id=str(self._request_id),
+            ),
+            self._loop,
+        )
+
+
+def current_progress() -> ProgressReporter | None:
+    """The progress reporter of the request being handled, if any."""
+    return _current.get()
+
+
+@contextlib.contextmanager
+def reporting_progress(reporter: ProgressReporter | None) -> Iterator[None]:
+    """
+    Make `reporter` the current reporter. Blocking calls run with `_run_blocking`
+    see it too, but not the threads they start themselves.
+    """
+    token = _current.set(reporter)
+    try:
+        yield
+    finally:
+        _current.reset(token)
@@ -0,0 +1,320 @@
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Literal
+
+import docker
+from docker.errors import DockerException, ImageNotFound
+from docker.models.containers import Container
+from docker.models.images import Image
+from docker.models.networks import Network
+from docker.models.volumes import Volume
+
+from .bulk import dependency_levels, run_ordered
+from .metrics import in_context
+from .pulls import ImagePulls
+from .recreate import config_changes, ensure_image, recreate, spec_labels
+
+# Label of the objects belonging to a project
+PROJECT_LABEL = "mcp-server-docker.project"
+
+Kind = Literal["image", "network", "volume", "container"]
+Action = Literal[
+    "pull", "create", "recreate", "start", "remove", "conflict", "unchanged"
+]
+
+
+@dataclass
+class Step:
+    kind: Kind
+    name: str
+    action: Action
+    # Settings that differ between the live object and the desired state
+    changes: list[str] = field(default_factory=list)
+    # Keys of the steps that must succeed before this one
+    after: set[str] = field(default_factory=set)
+    # The desired settings, or the live object
+    spec: dict[str, Any] | None = None
+    current: Any = None
+
+    @property
+    def key(self) -> str:
+        return f"{self.kind}:{self.name}"
+
+
+def _labeled(spec: dict[str, Any], project: str) -> dict[str, Any]:
+    """Add the project label to the labels of a spec."""
+    return {**spec, "labels": {**spec_labels(spec), PROJECT_LABEL: project}}
+
+
+def _volume_sources(volumes: dict[str, Any] | list[str] | None) -> list[str]:
+    """Names of the volumes (or host paths) mounted by a container spec."""
+    if isinstance(volumes, dict):
+        return list(volumes)
+    return [volume.split(":", 1)[0] for volume in volumes or []]
+
+
+def _find_images(
+    client: docker.DockerClient, references: list[str], max_parallel: int
+) -> dict[str, Image | None]:
+    """Inspect the images of the given references, None for those not present."""
+
+    @in_context
+    def find(reference: str) -> Image | None:
+        try:
+            return client.images.get(reference)
+        except ImageNotFound:
+            return None
+
+    if not references:
+        return {}
+    with ThreadPoolExecutor(max_workers=min(max_parallel, len(references))) as pool:
+        return dict(zip(references, pool.map(find, references)))
+
+
+def _plan_settings(
+    kind: Kind,
+    spec: dict[str, Any],
+    current: Network | Volume | None,
+    settings: dict[str, Any],
+) -> Step:
+    """Plan a network or volume, which Docker can't update in place."""
+    if current is None:
+        return Step(kind, spec["name"], "create", spec=spec)
+    changes = [
+        key
+        for key, value in settings.items()
+        if spec.get(key) is not None and value != spec[key]
+    ]
+    action = "conflict" if changes else "unchanged"
+    return Step(kind, spec["name"], action, changes, spec=spec, current=current)
+
+
+def plan_project(
+    client: docker.DockerClient,
+    project: str,
+    containers: list[dict[str, Any]],
+    networks: list[dict[str, Any]],
+    volumes: list[dict[str, Any]],
+    depends_on: dict[str, list[str]],
+    live_containers: list[Container],
+    live_networks: list[Network],
+    live_volumes: list[Volume],
+    *,
+    remove_orphans: bool,
+    max_parallel: int,
+) -> list[Step]:
+    """
+    Diff the desired containers, networks and volumes of a project (as the
+    arguments of `containers.create`, `networks.create` and `volumes.create`)
+    against the live objects carrying the project label, and return the steps
+    bringing the latter to the former, in dependency order.
+
+    Containers come after the networks and volumes they use, the containers
+    they depend on, and pulling their image. Orphans are removed (if
+    `remove_orphans`) after the containers that may use them are replaced.
+    """
+    steps: list[Step] = []
+    networks_by_name = {n.name: n for n in live_networks}
+    volumes_by_name = {v.name: v for v in live_volumes}
+    containers_by_name = {c.name: c for c in live_containers}
+
+    for spec in networks:
+        spec = _labeled(spec, project)
+        current = networks_by_name.get(spec["name"])
+        attrs = current.attrs if current else {}
+        steps.append(
+            _plan_settings(
+                "network",
+                spec,
+                current,
+                {
+                    "driver": attrs.get("Driver"),
+                    "internal": bool(attrs.get("Internal")),
+                    "labels": attrs.get("Labels") or {},
+                },
+            )
+        )
+    for spec in volumes:
+        spec = _labeled(spec, project)
+        current = volumes_by_name.get(spec["name"])
+        attrs = current.attrs if current else {}
+        steps.append(
+            _plan_settings(
+                "volume",
+                spec,
+                current,
+                {"driver": attrs.get("Driver"), "labels": attrs.get("Labels") or {}},
+            )
+        )
+
+    images = _find_images(
+        client, list(dict.fromkeys(spec["image"] for spec in containers)), max_parallel
+    )
+    for reference, image in images.items():
+        if image is None:
+            steps.append(Step("image", reference, "pull"))
+
+    network_names = {spec["name"] for spec in networks}
+    volume_names = {spec["name"] for spec in volumes}
+    for spec in containers:
+        spec = _labeled(spec, project)
+        name = spec["name"]
+        after = {f"container:{dependency}" for dependency in depends_on.get(name, ())}
+        after.add(f"image:{spec['image']}")
+        if spec.get("network") in network_names:
+            after.add(f"network:{spec['network']}")
+        after.update(
+            f"volume:{source}"
+            for source in _volume_sources(spec.get("volumes"))
+            if source in volume_names
+        )
+
+        current = containers_by_name.get(name)
+        image = images[spec["image"]]
+        if current is None:
+            action, changes = "create", []
+        else:
+            changes = config_changes(spec, image, current) if image else ["image"]
+            if changes:
+                action = "recreate"
+            elif current.status != "running":
+                action = "start"
+            else:
+                action = "unchanged"
+        steps.append(
+            Step("container", name, action, changes, after, spec=spec, current=current)
+        )
+
+    if remove_orphans:
+        desired = {step.key for step in steps}
+        orphans = [
+            Step("container", c.name, "remove", current=c)
+            for c in live_containers
+            if f"container:{c.name}" not in desired
+        ]
+        # Networks and volumes may be in use until the containers are replaced
+        replaced = {
+            step.key
+            for step in steps + orphans
+            if step.kind == "container" and step.action in ("recreate", "remove")
+        }
+        orphans += [
+            Step(kind, obj.name, "remove", after=set(replaced), current=obj)
+            for kind, objects in (("network", live_networks), ("volume", live_volumes))
+            for obj in objects
+            if f"{kind}:{obj.name}" not in desired
+        ]
+        steps += orphans
+
+    # Fail on circular dependencies before anything is done
+    keys = [step.key for step in steps]
+    dependency_levels(keys, {step.key: step.after for step in steps})
+
+    # Only wait for steps that do something
+    pending = {step.key for step in steps if step.action != "unchanged"}
+    for step in steps:
+        step.after = step.after & pending if step.key in pending else set()
+    levels, _ = dependency_levels(keys, {step.key: step.after for step in steps})
+    order = {key: index for index, level in enumerate(levels) for key in level}
+    return sorted(steps, key=lambda step: order[step.key])
+
+
+def _action(
+    client: docker.DockerClient, pulls: ImagePulls, step: Step
+) -> Callable[[], str]:
+    """The Docker calls carrying out a step, returning the resulting status."""
+    spec, current = step.spec or {}, step.current
+
+    def pull() -> str:
+        ensure_image(client, pulls, step.name, pull=True)
+        return "pulled"
+
+    def conflict() -> str:
+        raise DockerException(
+            f"The {step.kind} {step.name} can't be updated in place "
+            f"({', '.join(step.changes)} changed); remove it first"
+        )
+
+    def create_network() -> str:
+        client.networks.create(**spec)
+        return "created"
+
+    def create_volume() -> str:
+        client.volumes.create(**spec)
+        return "created"
+
+    def create_container() -> str:
+        client.containers.run(detach=True, **spec)
+        return "created"
+
+    def recreate_container() -> str:
+        recreate(client, pulls, current, spec, force=True)
+        return "recreated"
+
+    def start_container() -> str:
+        current.start()
+        return "started"
+
+    def remove_container() -> str:
+        current.stop()
+        current.remove()
+        return "removed"
+
+    def remove() -> str:
+        current.remove()
+        return "removed"
+
+    actions: dict[tuple[str, str], Callable[[], str]] = {
+        ("image", "pull"): pull,
+        ("network", "create"): create_network,
+        ("network", "conflict"): conflict,
+        ("network", "remove"): remove,
+        ("volume", "create"): create_volume,
+        ("volume", "conflict"): conflict,
+        ("volume", "remove"): remove,
+        ("container", "create"): create_container,
+        ("container", "recreate"): recreate_container,
+        ("container", "start"): start_container,
+        ("container", "remove"): remove_container,
+    }
+    return actions[step.kind, step.action]
+
+
+def apply_plan(
+    client: docker.DockerClient,
+    pulls: ImagePulls,
+    steps: list[Step],
+    *,
+    max_parallel: int,
+) -> dict[str, dict[str, Any]]:
+    """
+    Carry out the steps of a plan, at most `max_parallel` at once. Steps whose
+    dependencies are done run concurrently; a step is skipped if any of its
+    dependencies failed.
+
+    Returns the status or error of each step carried out, by key.
+    """
+    pending = [step for step in steps if step.action != "unchanged"]
+    actions = {step.key: _action(client, pulls, step) for step in pending}
+    results = run_ordered(
+        list(actions),
+        lambda key: actions[key](),
+        depends_on={step.key: step.after for step in pending},
+        max_parallel=max_parallel,
+    )
+    return {result.pop("container"): result for result in results}
+
+
+def describe_step(step: Step, result: dict[str, Any] | None = None) -> dict[str, Any]:
+    """Serialize a step of a plan, along with the result of carrying it out."""
+    described: dict[str, Any] = {
+        "kind": step.kind,
+        "name": step.name,
+        "action": step.action,
+    }
+    if step.changes:
+        described["changes"] = step.changes
+    if step.after:
+        described["after"] = sorted(step.after)
+    return {**described, **(result or {})}
@@ -0,0 +1,118 @@
+import threading
+from collections.abc import Callable
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Any
+
+import docker
+from docker.errors import DockerException
+from docker.models.images import Image
+from docker.utils import parse_repository_tag
+
+# Called with the fraction of a pull done, and a description of its last event
+ProgressCallback = Callable[[float, str], None]
+
+# Fraction of a layer done once it reaches each status. Downloading counts for
+# the first half of a layer, extracting for the second
+_LAYER_DONE = {
+    "Pulling fs layer": 0.0,
+    "Waiting": 0.0,
+    "Verifying Checksum": 0.5,
+    "Download complete": 0.5,
+    "Pull complete": 1.0,
+    "Already exists": 1.0,
+}
+
+
+def canonical_reference(reference: str) -> str:
+    """The reference to an image, with its tag made explicit (`latest` by default)."""
+    repository, tag = parse_repository_tag(reference)
+    if tag is None:
+        return f"{repository}:latest"
+    return reference
+
+
+def _layer_done(event: dict[str, Any]) -> float | None:
+    status = event.get("status", "")
+    if status in _LAYER_DONE:
+        return _LAYER_DONE[status]
+    if status in ("Downloading", "Extracting"):
+        detail = event.get("progressDetail") or {}
+        fraction = (
+            min(detail["current"] / detail["total"], 1.0)
+            if detail.get("total")
+            else 0.0
+        )
+        return fraction / 2 if status == "Downloading" else 0.5 + fraction / 2
+    return None
+
+
+@dataclass
+class _Pull:
+    result: Future = field(default_factory=Future)
+    listeners: list[ProgressCallback] = field(default_factory=list)
+    done: float = 0.0
+    message: str = ""
+
+
+class ImagePulls:
+    """
+    Pulls images with Docker's streaming pull endpoint, reporting progress as
+    the layers of an image are downloaded and extracted.
+
+    Concurrent pulls of the same image, e.g. from several sessions, share a
+    single pull: later callers wait for it, and get its progress from then on.
+    """
+
+    def __init__(self, client: docker.DockerClient):
+        self._client = client
+        self._lock = threading.Lock()
+        self._pulls: dict[str, _Pull] = {}
+
+    def pull(
+        self, reference: str, on_progress: ProgressCallback | None = None
+    ) -> Image:
+        key = canonical_reference(reference)
+
+        with self._lock:
+            pull = self._pulls.get(key)
+            leader = pull is None
+            if pull is None:
+                pull = self._pulls[key] = _Pull()
+            if on_progress is not None:
+                pull.listeners.append(on_progress)
+                if pull.done:
+                    on_progress(pull.done, pull.message)
+
+        if leader:
+            try:
+                self._stream(key, pull)
+                pull.result.set_result(self._client.images.get(key))
+            except BaseException as e:
+                # The callers waiting for the pull fail along with it
+                pull.result.set_exception(e)
+                raise
+            finally:
+                with self._lock:
+                    del self._pulls[key]
+        return pull.result.result()
+
+    def _stream(self, reference: str, pull: _Pull):
+        repository, tag = parse_repository_tag(reference)
+        layers: dict[str, float] = {}
+        events = self._client.api.pull(repository, tag=tag, stream=True, decode=True)
+        for event in events:
+            if "error" in event:
+                raise DockerException(event["error"])
+            layer, done = event.get("id"), _layer_done(event)
+            if layer is None or done is None:
+                continue
+
+            layers[layer] = done
+            with self._lock:
+                # A layer announced late would make progress go back
+                pull.done = max(pull.done, sum(layers.values()) / len(layers))
+                pull.message = f"{event['status']} {layer}"
+                progress, listeners = (pull.done, pull.message), list(pull.listeners)
+            for listener in listeners:
+                listener(*progress)
@@ -0,0 +1,216 @@
+import secrets
+from typing import Any
+
+import docker
+from docker.errors import DockerException, ImageNotFound, NotFound
+from docker.models.containers import Container
+from docker.models.images import Image
+from docker.utils import convert_port_bindings, convert_volume_binds, split_command
+from requests import RequestException
+
+from .pulls import ImagePulls, ProgressCallback
+
+
+def _environment(entries: list[str] | None) -> dict[str, str]:
+    environment = {}
+    for entry in entries or []:
+        key, _, value = entry.partition("=")
+        environment[key] = value
+    return environment
+
+
+def spec_labels(spec: dict[str, Any]) -> dict[str, str]:
+    """The labels of a container spec, given as a dict or a list."""
+    labels = spec.get("labels") or {}
+    # A list of labels gives their names, with empty values
+    return dict(labels) if isinstance(labels, dict) else dict.fromkeys(labels, "")
+
+
+def _port_bindings(
+    bindings: dict[str, list[dict[str, Any]] | None] | None,
+) -> dict[str, list[tuple[str, str]]]:
+    return {
+        port: sorted(
+            (binding.get("HostIp") or "", str(binding.get("HostPort") or ""))
+            for binding in port_bindings or []
+        )
+        for port, port_bindings in (bindings or {}).items()
+    }
+
+
+def _binds(binds: list[str] | None) -> list[str]:
+    # Binds without a mode are read-write
+    return sorted(
+        bind if bind.count(":") >= 2 else f"{bind}:rw" for bind in binds or []
+    )
+
+
+def _network(network_mode: str | None) -> str:
+    # Containers without a network are on the default bridge network
+    return "default" if network_mode in (None, "", "bridge") else network_mode
+
+
+def desired_config(spec: dict[str, Any], image: Image) -> dict[str, Any]:
+    """
+    The configuration Docker gives a container created from `image` with
+    `spec`, the arguments of `containers.create`, as far as the server sets it.
+    """
+    image_config = image.attrs.get("Config") or {}
+
+    entrypoint = split_command(spec["entrypoint"]) if spec.get("entrypoint") else None
+    command = split_command(spec["command"]) if spec.get("command") else None
+    # Like the daemon, only inherit the image's command with its entrypoint
+    if not entrypoint:
+        entrypoint = image_config.get("Entrypoint")
+        if not command:
+            command = image_config.get("Cmd")
+
+    environment = _environment(image_config.get("Env"))
+    environment.update(spec.get("environment") or {})
+
+    labels = {**(image_config.get("Labels") or {}), **spec_labels(spec)}
+
+    return {
+        "image": image.id,
+        "entrypoint": entrypoint or None,
+        "command": command or None,
+        "environment": environment,
+        "labels": labels,
+        "ports": _port_bindings(convert_port_bindings(spec.get("ports") or {})),
+        "volumes": _binds(convert_volume_binds(spec.get("volumes") or [])),
+        "network": _network(spec.get("network")),
+        "auto_remove": bool(spec.get("auto_remove")),
+    }
+
+
+def current_config(container: Container) -> dict[str, Any]:
+    """The configuration of an (inspected) container, comparable to `desired_config`."""
+    config = container.attrs.get("Config") or {}
+    host_config = container.attrs.get("HostConfig") or {}
+    return {
+        "image": container.attrs.get("Image"),
+        "entrypoint": config.get("Entrypoint") or None,
+        "command": config.get("Cmd") or None,
+        "environment": _environment(config.get("Env")),
+        "labels": config.get("Labels") or {},
+        "ports": _port_bindings(host_config.get("PortBindings")),
+        "volumes": _binds(host_config.get("Binds")),
+        "network": _network(host_config.get("NetworkMode")),
+        "auto_remove": bool(host_config.get("AutoRemove")),
+    }
+
+
+def config_changes(
+    spec: dict[str, Any], image: Image, container: Container
+) -> list[str]:
+    """Names of the settings of `container` that differ from those `spec` asks for."""
+    desired, current = desired_config(spec, image), current_config(container)
+    changes = [key for key in desired if desired[key] != current[key]]
+    # Without a name, Docker picks one, so only asking for another name is a change
+    if spec.get("name") and spec["name"] != container.name:
+        changes.append("name")
+    return changes
+
+
+def ensure_image(
+    client: docker.DockerClient,
+    pulls: ImagePulls,
+    reference: str,
+    pull: bool,
+    on_progress: ProgressCallback | None = None,
+) -> Image:
+    """
+    Return the image with the given reference, pulling it if missing or if
+    `pull`. Pulls go through `pulls`, to be shared with concurrent pulls of
+    the image and report their progress.
+    """
+    if not pull:
+        try:
+            return client.images.get(reference)
+        except ImageNotFound:
+            pass
+    return pulls.pull(reference, on_progress)
+
+
+def recreate(
+    client: docker.DockerClient,
+    pulls: ImagePulls,
+    container: Container,
+    spec: dict[str, Any],
+    *,
+    stop_timeout: int | None = None,
+    pull: bool = False,
+    force: bool = False,
+    on_progress: ProgressCallback | None = None,
+) -> tuple[Container, list[str]]:
+    """
+    Replace `container` by a new container created with `spec`, the arguments
+    of `containers.create`, keeping downtime to a minimum.
+
+    The image is pulled if needed and the new container created (under a
+    temporary name) while the old one still runs, since creating a container
+    doesn't bind its ports. Only then is the old container stopped and removed,
+    and the new one renamed and started.
+
+    If pulling or creating fails, the old container is left untouched. If
+    stopping or removing it fails, the new container is removed, and the old
+    one restarted if it was stopped. Once the old container is gone, failing
+    to rename or start the new one raises an error naming it, as it's left
+    created under its temporary name, or stopped.
+
+    Unless `force`, the container is left as is if its configuration wouldn't
+    change. Returns the resulting container, along with the names of the
+    settings that changed.
+    """
+    image = ensure_image(client, pulls, spec["image"], pull, on_progress)
+    changes = config_changes(spec, image, container)
+    if not changes and not force:
+        return container, changes
+
+    name = spec.get("name")
+    temporary_name = f"{name}-{secrets.token_hex(4)}" if name else None
+    replacement = client.containers.create(**{**spec, "name": temporary_name})
+
+    was_running = bool((container.attrs.get("State") or {}).get("Running"))
+    stopped = False
+    try:
+        container.stop(timeout=stop_timeout)
+        stopped = True
+        if (container.attrs.get("HostConfig") or {}).get("AutoRemove"):
+            # Docker removes it on its own once stopped
+            container.wait(condition="removed")
+        else:
+            container.remove()
+    except NotFound:
+        pass
+    except (DockerException, RequestException) as e:
+        replacement.remove(force=True)
+        if stopped and was_running:
+            try:
+                container.start()
+            except (DockerException, RequestException) as restart_error:
+                raise DockerException(
+                    f"Failed to remove container {container.name} ({e}), then to "
+                    f"restart it ({restart_error}). It's left stopped"
+                ) from e
+        raise
+
+    if name:
+        try:
+            replacement.rename(name)
+        except (DockerException, RequestException) as e:
+            raise DockerException(
+                f"Removed container {container.name}, but failed to rename its "
+                f"replacement {temporary_name} ({replacement.short_id}) to {name}: {e}. "
+                "The replacement is left created, not started"
+            ) from e
+    try:
+        replacement.start()
+    except (DockerException, RequestException) as e:
+        raise DockerException(
+            f"Removed container {container.name}, but failed to start its "
+            f"replacement {name or replacement.short_id}: {e}. The replacement is "
+            "left created, not started"
+        ) from e
+    replacement.reload()
+    return replacement, changes
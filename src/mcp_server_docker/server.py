@@ -1,73 +1,327 @@
-import json
-from collections.abc import Sequence
-from typing import Any
+import asyncio
+import contextlib
+import contextvars
+import functools
+import threading
 import traceback
+from collections import Counter
+from collections.abc import Callable, Iterable, Sequence
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+from urllib.parse import unquote
 
 import docker
-import mcp.types as types
+from docker.errors import DockerException, NotFound
 from docker.models.containers import Container
-from mcp.server import Server
+from docker.models.images import Image
+from docker.models.networks import Network
+from docker.models.volumes import Volume
+from mcp import types
 from pydantic import AnyUrl, ValidationError
-
+from requests import RequestException
+
+from .app import app
+from .build import build_image, prepare_context
+from .bulk import run_ordered
+from .encoding import encode_response, json_dumps
+from .exec import exec_in_container
+from .hosts import DockerHost, DockerHosts
 from .input_schemas import (
+    ApplyProjectInput,
     BuildImageInput,
+    BulkContainerActionInput,
+    BulkRemoveContainersInput,
+    BulkStopContainersInput,
     ContainerActionInput,
     CreateContainerInput,
     CreateNetworkInput,
     CreateVolumeInput,
     DockerComposePromptInput,
+    ExecInContainerInput,
     FetchContainerLogsInput,
     ListContainersInput,
+    ListContainerStatsInput,
     ListImagesInput,
+    ListInput,
     ListNetworksInput,
     ListVolumesInput,
+    PullImagesInput,
     PullPushImageInput,
     RecreateContainerInput,
     RemoveContainerInput,
     RemoveImageInput,
     RemoveNetworkInput,
     RemoveVolumeInput,
+    ResponseFormatInput,
 )
-from .output_schemas import docker_to_dict
+from .logs import LogCursors, fetch_logs
+from .metrics import in_context, metrics
+from .output_schemas import (
+    docker_to_dict,
+    docker_to_plan_dict,
+    docker_to_summary_dict,
+    select_fields,
+)
+from .pagination import Page, paginate
+from .progress import ProgressReporter, current_progress, reporting_progress
+from .project import PROJECT_LABEL, apply_plan, describe_step, plan_project
+from .pulls import canonical_reference
+from .recreate import recreate
 from .settings import ServerSettings
+from .tools import ToolRegistry, ToolSpec
 
-app = Server("docker-server")
-_docker: docker.DockerClient
+_hosts: DockerHosts
 _server_settings: ServerSettings
+_executor: ThreadPoolExecutor
+_log_cursors: LogCursors
+
+# Seconds to wait for the first samples of a container's stats
+_STATS_WAIT = 3.0
+
+# Resources of a container, at docker://containers/{id}/{type}
+_CONTAINER_RESOURCES = ("logs", "stats", "inspect")
+_SUBSCRIBABLE_RESOURCES = ("logs", "stats")
+
+# Names of the objects left out of the docker_compose prompt listed in its summary
+_SNAPSHOT_NAMES = 20
+
+
+async def _run_blocking[T](
+    func: Callable[..., T], *args: Any, timeout: float | None = None, **kwargs: Any
+) -> T:
+    """
+    Run a blocking Docker SDK call on the bounded executor, so that a slow call
+    (e.g. pulling an image) doesn't stall the event loop and every other request.
+
+    If the caller is cancelled or the timeout expires, the result is discarded;
+    the worker thread itself can't be interrupted and finishes in the background.
+    """
+    loop = asyncio.get_running_loop()
+    # Like `asyncio.to_thread`, run in a copy of the context, e.g. to report progress
+    context = contextvars.copy_context()
+    future = loop.run_in_executor(
+        _executor, functools.partial(context.run, func, *args, **kwargs)
+    )
+    deadline = asyncio.timeout(timeout)
+    try:
+        async with deadline:
+            return await future
+    except TimeoutError:
+        if deadline.expired():
+            raise TimeoutError(f"Docker operation timed out after {timeout}s") from None
+        raise
 
 
-@app.list_prompts()
-async def list_prompts() -> list[types.Prompt]:
-    return [
-        types.Prompt(
-            name="docker_compose",
-            description="Treat the LLM like a Docker Compose manager",
-            arguments=[
-                types.PromptArgument(
-                    name="name", description="Unique name of the project", required=True
-                ),
-                types.PromptArgument(
-                    name="containers",
-                    description="Describe containers you want",
-                    required=True,
-                ),
-            ],
-        )
+def _timeout_for(tool_name: str | None = None) -> float | None:
+    if tool_name is not None and tool_name in _server_settings.tool_timeouts:
+        return _server_settings.tool_timeouts[tool_name]
+    return _server_settings.default_timeout
+
+
+def _list_containers(host: DockerHost, **kwargs: Any) -> list[Container]:
+    """List containers sparsely (i.e. without inspecting them), through the inventory cache."""
+    summaries = host.inventory.list("container", host.client.api.containers, **kwargs)
+    return [host.client.containers.prepare_model(summary) for summary in summaries]
+
+
+def _list_images(host: DockerHost, **kwargs: Any) -> list[dict[str, Any]]:
+    # `images.list()` inspects every image, so use the summaries from the list endpoint
+    return host.inventory.list("image", host.client.api.images, **kwargs)
+
+
+def _list_networks(host: DockerHost, **kwargs: Any) -> list[Network]:
+    summaries = host.inventory.list("network", host.client.api.networks, **kwargs)
+    return [host.client.networks.prepare_model(summary) for summary in summaries]
+
+
+def _list_volumes(host: DockerHost, **kwargs: Any) -> list[Volume]:
+    response = host.inventory.list("volume", host.client.api.volumes, **kwargs)
+    return [host.client.volumes.prepare_model(v) for v in response.get("Volumes") or []]
+
+
+def _image_index(host: DockerHost) -> dict[str, Image]:
+    """
+    Index all images by ID with a single listing, so that serializing many
+    containers doesn't inspect the image of every container.
+    """
+    return {
+        summary["Id"]: host.client.images.prepare_model(summary)
+        for summary in _list_images(host, all=True)
+    }
+
+
+def _inspect_containers(
+    host: DockerHost, containers: list[Container]
+) -> list[Container]:
+    """Inspect sparsely listed containers, skipping any removed in the meantime."""
+    inspected = []
+    for container in containers:
+        try:
+            attrs = host.inventory.inspect_container(
+                container.id, host.client.api.inspect_container
+            )
+        except NotFound:
+            continue
+        inspected.append(host.client.containers.prepare_model(attrs))
+    return inspected
+
+
+def _paginate[T](
+    items: Sequence[T], key: Callable[[T], str], args: ListInput
+) -> Page[T]:
+    # Keep the order given by the daemon unless the caller pages through the listing
+    if not args.paginated:
+        return Page(items=list(items), total=len(items), next_cursor=None)
+    return paginate(items, key, args.limit, args.cursor)
+
+
+def _list_objects[T](
+    args: ListInput,
+    load: Callable[[DockerHost], list[T]],
+    key: Callable[[T], str],
+    render: Callable[[DockerHost, list[T]], list[dict[str, Any]]],
+) -> Any:
+    """
+    List objects with `load` on the requested host, or on every host in
+    parallel if `host` is `*`, then paginate them and serialize the page with
+    `render`.
+
+    When listing across hosts, the result always has the shape of a page, with
+    the errors of hosts that failed under `errors`.
+    """
+    fan_out = args.host == "*"
+    errors: dict[str, str] = {}
+
+    def collect(results: list[tuple[DockerHost, Any]]) -> list[tuple[DockerHost, Any]]:
+        collected = []
+        for host, result in results:
+            if not isinstance(result, Exception):
+                collected.append((host, result))
+            elif fan_out:
+                errors[host.name] = str(result)
+            else:
+                raise result
+        return collected
+
+    hosts = None if fan_out else [_hosts.get(args.host)]
+    entries = [
+        (host, item)
+        for host, items in collect(_hosts.map(load, hosts))
+        for item in items
     ]
+    # Sorting by host first keeps the objects of a host together on a page
+    page = _paginate(entries, lambda entry: f"{entry[0].name}/{key(entry[1])}", args)
+
+    groups: dict[str, tuple[DockerHost, list[T]]] = {}
+    for host, item in page.items:
+        groups.setdefault(host.name, (host, []))[1].append(item)
+    rendered = _hosts.map(
+        lambda host: render(host, groups[host.name][1]),
+        [host for host, _ in groups.values()],
+    )
+
+    items = []
+    for host, objects in collect(rendered):
+        objects = select_fields(objects, args.fields)
+        if fan_out:
+            objects = [{"host": host.name, **obj} for obj in objects]
+        items.extend(objects)
+
+    if not args.paginated and not fan_out:
+        return items
+    listing = {"items": items, "total": page.total, "next_cursor": page.next_cursor}
+    if errors:
+        listing["errors"] = errors
+    return listing
+
+
+async def _project_snapshot(
+    project_label: str,
+) -> tuple[list[dict[str, Any]], list[dict[str, Any]], list[dict[str, Any]]]:
+    """
+    The containers (stopped ones too), volumes and networks carrying the
+    project label, listed concurrently and projected to the fields needed to
+    plan changes to them.
+    """
+    host = await _run_blocking(_hosts.get, timeout=_timeout_for())
+    filters = {"label": project_label}
+    containers, volumes, networks = await asyncio.gather(
+        _run_blocking(
+            _list_containers, host, all=True, filters=filters, timeout=_timeout_for()
+        ),
+        _run_blocking(_list_volumes, host, filters=filters, timeout=_timeout_for()),
+        _run_blocking(_list_networks, host, filters=filters, timeout=_timeout_for()),
+    )
+
+    def project(
+        objects: list[Container] | list[Volume] | list[Network],
+    ) -> list[dict[str, Any]]:
+        return sorted(
+            (docker_to_plan_dict(obj) for obj in objects), key=lambda obj: obj["name"]
+        )
+
+    return project(containers), project(volumes), project(networks)
+
+
+def _render_snapshot(
+    sections: list[tuple[str, list[dict[str, Any]]]], max_bytes: int
+) -> str:
+    """
+    Render the objects of each section one compact JSON object per line,
+    within `max_bytes` in all. Sections smaller than an equal share of the
+    budget are rendered whole, leaving the rest to the larger ones.
+
+    The objects left out are summarized by count (and for containers by
+    status) and name, so that the model knows they exist.
+    """
+    rendered = [[json_dumps(obj) for obj in objects] for _, objects in sections]
+    sizes = [sum(len(line.encode()) + 1 for line in lines) for lines in rendered]
+    budgets = [0] * len(sections)
+    remaining = max_bytes
+    # Smallest sections first, each getting at most an equal share of what's left
+    order = sorted(range(len(sections)), key=lambda i: sizes[i])
+    for position, index in enumerate(order):
+        budgets[index] = min(sizes[index], remaining // (len(order) - position))
+        remaining -= budgets[index]
+
+    output = []
+    for (section, objects), lines, budget in zip(sections, rendered, budgets):
+        output.append(f"<BEGIN {section}>")
+        shown = 0
+        for line in lines:
+            budget -= len(line.encode()) + 1
+            if budget < 0:
+                break
+            output.append(line)
+            shown += 1
+
+        rest = objects[shown:]
+        if rest:
+            statuses = Counter(obj["status"] for obj in rest if "status" in obj)
+            by_status = ", ".join(f"{n} {status}" for status, n in statuses.items())
+            names = ", ".join(obj["name"] for obj in rest[:_SNAPSHOT_NAMES])
+            if len(rest) > _SNAPSHOT_NAMES:
+                names += f" and {len(rest) - _SNAPSHOT_NAMES} more"
+            output.append(
+                f"[{len(rest)} more {section.lower()} not shown"
+                + (f" ({by_status})" if by_status else "")
+                + f": {names}. List them with the tools for details]"
+            )
+        output.append(f"<END {section}>")
+    return "\n".join(output)
 
 
-@app.get_prompt()
 async def get_prompt(
     name: str, arguments: dict[str, str] | None
 ) -> types.GetPromptResult:
     if name == "docker_compose":
         input = DockerComposePromptInput.model_validate(arguments)
-        project_label = f"mcp-server-docker.project={input.name}"
-        containers: list[Container] = _docker.containers.list(
-            filters={"label": project_label}
+        project_label = f"{PROJECT_LABEL}={input.name}"
+        containers, volumes, networks = await _project_snapshot(project_label)
+        snapshot = _render_snapshot(
+            [("CONTAINERS", containers), ("VOLUMES", volumes), ("NETWORKS", networks)],
+            _server_settings.prompt_snapshot_max_bytes,
         )
-        volumes = _docker.volumes.list(filters={"label": project_label})
-        networks = _docker.networks.list(filters={"label": project_label})
 
         return types.GetPromptResult(
             messages=[
@@ -93,15 +347,7 @@ Every Docker resource you create must also be prefixed with the project name, fo
 
 Here are the resources currently present in the project, based on the presence of the above label:
 
-<BEGIN CONTAINERS>
-{json.dumps([docker_to_dict(c) for c in containers], indent=2)}
-<END CONTAINERS>
-<BEGIN VOLUMES>
-{json.dumps([docker_to_dict(v) for v in volumes], indent=2)}
-<END VOLUMES>
-<BEGIN NETWORKS>
-{json.dumps([docker_to_dict(n) for n in networks], indent=2)}
-<END NETWORKS>
+{snapshot}
 
 Do not retry the same failed action more than once. Prefer terminating your output
 when presented with 3 errors in a row, and ask a clarifying question to
@@ -181,6 +427,7 @@ The following are guidelines for you to follow when interacting with Docker Tool
 
 - Always prefer `run_container` for starting a container, instead of `create_container`+`start_container`.
 - Always prefer `recreate_container` for updating a container, instead of `stop_container`+`remove_container`+`run_container`.
+- Always prefer `apply_project` for applying a plan in a single call, with the desired state of every resource in the project. Call it with `dry_run` to compute the plan you present.
 """,
                     ),
                 )
@@ -190,312 +437,935 @@ The following are guidelines for you to follow when interacting with Docker Tool
     raise ValueError(f"Unknown prompt name: {name}")
 
 
-@app.list_resources()
-async def list_resources() -> list[types.Resource]:
+async def list_resources(
+    cursor: str | None = None,
+) -> tuple[list[types.Resource], str | None]:
+    """
+    A page of the concrete resources: the server's own, then the logs and stats
+    of `resource_page_size` running containers per page, with the cursor of
+    the next page. Other resources are only advertised as templates.
+    """
     resources = []
-    for container in _docker.containers.list():
+    if cursor is None:
+        resources = [
+            types.Resource(
+                uri=AnyUrl("docker://server/cache"),
+                name="Inventory cache",
+                description="Hit and miss counters of the server's cache of Docker objects",
+                mimeType="application/json",
+            ),
+            types.Resource(
+                uri=AnyUrl("docker://server/metrics"),
+                name="Server metrics",
+                description="Latency, Docker API calls and response size of each tool, Docker API calls per host, cache hit rates, and the most recent tool calls",
+                mimeType="application/json",
+            ),
+        ]
+    page = await _run_blocking(
+        lambda: paginate(
+            _list_containers(_hosts.get()),
+            lambda container: container.id,
+            _server_settings.resource_page_size,
+            cursor,
+        ),
+        timeout=_timeout_for(),
+    )
+    for container in page.items:
+        # Listed containers aren't inspected, so their name comes from the summary
+        summary = docker_to_summary_dict(container)
+        container_id, container_name = summary["id"], summary["name"]
         resources.extend(
             [
                 types.Resource(
-                    uri=AnyUrl(f"docker://containers/{container.id}/logs"),
-                    name=f"Logs for {container.name}",
-                    description=f"Live logs for container {container.name}",
+                    uri=AnyUrl(f"docker://containers/{container_id}/logs"),
+                    name=f"Logs for {container_name}",
+                    description=f"Live logs for container {container_name}",
                     mimeType="text/plain",
                 ),
                 types.Resource(
-                    uri=AnyUrl(f"docker://containers/{container.id}/stats"),
-                    name=f"Stats for {container.name}",
-                    description=f"Live resource usage stats for container {container.name}",
+                    uri=AnyUrl(f"docker://containers/{container_id}/stats"),
+                    name=f"Stats for {container_name}",
+                    description=f"Live resource usage stats for container {container_name}",
                     mimeType="application/json",
                 ),
             ]
         )
-    return resources
+    return resources, page.next_cursor
+
+
+def _cache_stats() -> dict[str, dict[str, Any]]:
+    return {host.name: host.inventory.stats() for host in _hosts.connected()}
 
 
-@app.read_resource()
 async def read_resource(uri: AnyUrl) -> str:
+    if str(uri) == "docker://server/cache":
+        return encode_response(_cache_stats(), _server_settings.response_format)
+    if str(uri) == "docker://server/metrics":
+        return encode_response(
+            metrics.snapshot(_cache_stats()), _server_settings.response_format
+        )
+
+    kind, ref, resource_type = _parse_resource_uri(uri)
+    return await _run_blocking(
+        _read_object_resource, kind, ref, resource_type, timeout=_timeout_for()
+    )
+
+
+async def subscribe_resource(uri: AnyUrl) -> None:
+    container_id, resource_type = _parse_container_uri(uri)
+    if resource_type not in _SUBSCRIBABLE_RESOURCES:
+        raise ValueError(f"Container {resource_type} can't be subscribed to")
+    host = await _run_blocking(_hosts.get)
+    # Fail early if the container doesn't exist, and resolve names to IDs
+    container = await _run_blocking(_resolve_container, host, container_id)
+    host.subscriptions.subscribe(
+        str(uri), container.id, resource_type, app.request_context.session
+    )
+
+
+async def unsubscribe_resource(uri: AnyUrl) -> None:
+    for host in _hosts.connected():
+        host.subscriptions.unsubscribe(str(uri), app.request_context.session)
+
+
+def _parse_container_uri(uri: AnyUrl) -> tuple[str, str]:
     if not str(uri).startswith("docker://containers/"):
         raise ValueError(f"Unknown resource URI: {uri}")
 
     parts = str(uri).split("/")
-    if len(parts) != 5:  # docker://containers/{id}/{logs|stats}
+    if len(parts) != 5:  # docker://containers/{id}/{logs|stats|inspect}
         raise ValueError(f"Invalid container resource URI: {uri}")
 
     container_id = parts[3]
     resource_type = parts[4]
-    container = _docker.containers.get(container_id)
+    if resource_type not in _CONTAINER_RESOURCES:
+        raise ValueError(f"Unknown container resource type: {resource_type}")
+
+    return container_id, resource_type
+
+
+def _parse_resource_uri(uri: AnyUrl) -> tuple[str, str, str | None]:
+    """
+    Split the URI of a Docker object's resource into the kind of object, its
+    ID or name, and for containers the type of resource.
+    """
+    for kind in ("images", "volumes"):
+        prefix = f"docker://{kind}/"
+        if str(uri).startswith(prefix) and len(str(uri)) > len(prefix):
+            # Image references may contain slashes, e.g. `library/nginx:latest`
+            return kind, unquote(str(uri).removeprefix(prefix)), None
+
+    container_id, resource_type = _parse_container_uri(uri)
+    return "containers", container_id, resource_type
+
+
+def _match_reference(
+    objects: Iterable[tuple[str, Iterable[str]]], ref: str
+) -> str | None:
+    """
+    The ID of the object, given as (ID, names), that `ref` names exactly by ID
+    or name, or else whose ID alone starts with `ref`, like Docker resolves
+    references. None if no object, or several, match.
+    """
+    prefixed = []
+    for object_id, names in objects:
+        if ref == object_id or ref in names:
+            return object_id
+        if object_id.removeprefix("sha256:").startswith(ref.removeprefix("sha256:")):
+            prefixed.append(object_id)
+    return prefixed[0] if len(prefixed) == 1 else None
+
+
+def _resolve_container(host: DockerHost, ref: str) -> Container:
+    """
+    Get a container by ID, short ID or name. With the inventory cache, it's
+    resolved from the cached listing and inspection, so that reading its
+    resources repeatedly doesn't inspect it every time.
+    """
+    if host.inventory.enabled:
+        summaries = host.inventory.list(
+            "container", host.client.api.containers, all=True
+        )
+        container_id = _match_reference(
+            (
+                (
+                    summary["Id"],
+                    [name.lstrip("/") for name in summary.get("Names") or []],
+                )
+                for summary in summaries
+            ),
+            ref,
+        )
+        if container_id is not None:
+            attrs = host.inventory.inspect_container(
+                container_id, host.client.api.inspect_container
+            )
+            return host.client.containers.prepare_model(attrs)
+    # Let Docker resolve it, or report it missing or ambiguous
+    return host.client.containers.get(ref)
+
+
+def _resolve_image(host: DockerHost, ref: str) -> Image:
+    """Get an image by ID, short ID or reference, from the cached listing if possible."""
+    if host.inventory.enabled:
+        images = _image_index(host)
+        candidates = [
+            (image.id, image.attrs.get("RepoTags") or []) for image in images.values()
+        ]
+        image_id = _match_reference(candidates, ref) or _match_reference(
+            candidates, canonical_reference(ref)
+        )
+        if image_id is not None:
+            return images[image_id]
+    return host.client.images.get(ref)
+
+
+def _resolve_volume(host: DockerHost, name: str) -> Volume:
+    """Get a volume by name, from the cached listing if possible."""
+    if host.inventory.enabled:
+        for volume in _list_volumes(host):
+            if volume.name == name:
+                return volume
+    return host.client.volumes.get(name)
+
 
+def _read_object_resource(kind: str, ref: str, resource_type: str | None) -> str:
+    host = _hosts.get()
+    response_format = _server_settings.response_format
+
+    if kind == "images":
+        return encode_response(
+            docker_to_dict(_resolve_image(host, ref)), response_format
+        )
+    if kind == "volumes":
+        return encode_response(
+            docker_to_dict(_resolve_volume(host, ref)), response_format
+        )
+
+    container = _resolve_container(host, ref)
     if resource_type == "logs":
-        logs = container.logs(tail=100).decode("utf-8")
-        return json.dumps(logs.split("\n"))
+        logs, _ = fetch_logs(container, tail=100, max_bytes=256 * 1024)
+        return encode_response(logs, response_format)
+    if resource_type == "inspect":
+        return encode_response(
+            docker_to_dict(container, images=_image_index(host)), response_format
+        )
+
+    stats = host.stats.get(container.id, wait=_STATS_WAIT, include_raw=True)
+    return encode_response(stats, response_format)
+
+
+async def call_tool(
+    name: str, arguments: Any
+) -> Sequence[types.TextContent | types.ImageContent | types.EmbeddedResource]:
+    tool = _tools.get(name)
+    if tool is None:
+        return [types.TextContent(type="text", text=f"Unknown tool: {name}")]
+
+    if arguments is None:
+        arguments = {}
+
+    with metrics.tool_call(name) as invocation:
+        try:
+            args = tool.input_model(**arguments)
+            with reporting_progress(ProgressReporter.for_request(app.request_context)):
+                result = await _run_blocking(
+                    tool.handler, args, timeout=_timeout_for(name)
+                )
+
+        except ValidationError as e:
+            invocation.outcome = "invalid"
+            await app.request_context.session.send_log_message(
+                "error", "Failed to validate input provided by LLM: " + str(e)
+            )
+            return [
+                types.TextContent(
+                    type="text", text=f"ERROR: You provided invalid Tool inputs: {e}"
+                )
+            ]
+
+        except Exception as e:
+            await app.request_context.session.send_log_message(
+                "error", traceback.format_exc()
+            )
+            raise e
+
+        response_format = _server_settings.response_format
+        if isinstance(args, ResponseFormatInput) and args.response_format is not None:
+            response_format = args.response_format
+        text = encode_response(result, response_format)
+        invocation.response_bytes = len(text.encode())
+    return [types.TextContent(type="text", text=text)]
+
+
+# Tool handlers make the (blocking) Docker SDK calls given validated inputs
+
+
+def _list_containers_tool(args: ListContainersInput) -> Any:
+    def render(host: DockerHost, containers: list[Container]) -> list[dict[str, Any]]:
+        if args.detail == "summary":
+            return [docker_to_summary_dict(c) for c in containers]
+        containers = _inspect_containers(host, containers)
+        # One image listing instead of inspecting the image of every container
+        images = _image_index(host) if containers else {}
+        return [docker_to_dict(c, images=images) for c in containers]
+
+    # Sparse listing skips inspecting every container, so that at most the
+    # containers on the requested page get inspected
+    return _list_objects(
+        args,
+        lambda host: _list_containers(host, **args.model_dump()),
+        lambda c: c.id,
+        render,
+    )
+
+
+def _list_container_stats_tool(args: ListContainerStatsInput) -> Any:
+    fan_out = args.host == "*"
+
+    def collect(host: DockerHost) -> list[dict[str, Any]]:
+        containers = [
+            docker_to_summary_dict(c)
+            for c in _list_containers(host, **args.model_dump())
+        ]
+        stats = host.stats.get_many([c["id"] for c in containers], wait=args.wait)
+        return [
+            stats[c["id"]]
+            or {"id": c["id"], "name": c["name"], "error": "No stats sampled yet"}
+            for c in containers
+        ]
 
-    elif resource_type == "stats":
-        stats = container.stats(stream=False)
-        return json.dumps(stats, indent=2)
+    items = []
+    hosts = None if fan_out else [_hosts.get(args.host)]
+    for host, result in _hosts.map(collect, hosts):
+        if not fan_out:
+            if isinstance(result, Exception):
+                raise result
+            items.extend(result)
+        elif isinstance(result, Exception):
+            items.append({"host": host.name, "error": str(result)})
+        else:
+            items.extend({"host": host.name, **stats} for stats in result)
+    return items
+
+
+def _create_container_tool(args: CreateContainerInput) -> Any:
+    host = _hosts.get(args.host)
+    container = host.client.containers.create(**args.model_dump())
+    host.inventory.invalidate("container", container.id)
+    return docker_to_dict(container)
+
+
+def _run_container_tool(args: CreateContainerInput) -> Any:
+    host = _hosts.get(args.host)
+    container = host.client.containers.run(**args.model_dump())
+    host.inventory.invalidate("container", container.id)
+    return docker_to_dict(container)
+
+
+def _recreate_container_tool(args: RecreateContainerInput) -> Any:
+    host = _hosts.get(args.host)
+    reporter = current_progress()
+    container = host.client.containers.get(args.resolved_container_id)
+
+    def on_progress(done: float, message: str):
+        if reporter is not None:
+            reporter.report(done, 1, message)
+
+    # The inputs of `run_container`, without those identifying the old container
+    spec = args.model_dump(exclude={"container_id", "resolved_container_id"})
+    replacement, changes = recreate(
+        host.client,
+        host.pulls,
+        container,
+        spec,
+        stop_timeout=args.stop_timeout,
+        pull=args.pull,
+        force=args.force,
+        on_progress=on_progress,
+    )
+    host.inventory.invalidate("image")
+    host.inventory.invalidate("container", container.id)
+    host.inventory.invalidate("container", replacement.id)
+    return docker_to_dict(
+        replacement,
+        {"recreated": replacement.id != container.id, "changes": changes},
+    )
+
+
+def _start_container_tool(args: ContainerActionInput) -> Any:
+    host = _hosts.get(args.host)
+    container = host.client.containers.get(args.container_id)
+    container.start()
+    host.inventory.invalidate("container", container.id)
+    return docker_to_dict(container)
+
+
+def _stop_container_tool(args: ContainerActionInput) -> Any:
+    host = _hosts.get(args.host)
+    container = host.client.containers.get(args.container_id)
+    container.stop()
+    host.inventory.invalidate("container", container.id)
+    return docker_to_dict(container)
+
+
+def _remove_container_tool(args: RemoveContainerInput) -> Any:
+    host = _hosts.get(args.host)
+    container = host.client.containers.get(args.container_id)
+    container.remove(force=args.force)
+    host.inventory.invalidate("container", container.id)
+    return docker_to_dict(container, {"status": "removed"})
+
+
+def _bulk_targets(
+    host: DockerHost, args: BulkContainerActionInput
+) -> tuple[list[str], dict[str, list[str]], dict[str, str]]:
+    """
+    Resolve the containers selected by a bulk tool, and both sides of the
+    dependencies between them, to full container IDs with one sparse listing.
+    Also returns the names of the containers, by ID.
+
+    Containers of `container_ids` that don't resolve are kept as given, to fail
+    on their own. Dependencies on containers outside the selection are rejected.
+    """
+    if args.container_ids is not None:
+        containers = _list_containers(host, all=True)
+    else:
+        filters = args.filters.model_dump(exclude_none=True) if args.filters else None
+        containers = _list_containers(host, all=True, filters=filters)
+    candidates = [
+        (c.id, [name.lstrip("/") for name in c.attrs.get("Names") or []])
+        for c in containers
+    ]
+    names = {container_id: refs[0] for container_id, refs in candidates if refs}
 
+    aliases: dict[str, str] = {}
+    if args.container_ids is not None:
+        for ref in args.container_ids:
+            aliases[ref] = _match_reference(candidates, ref) or ref
+        targets = list(dict.fromkeys(aliases.values()))
     else:
-        raise ValueError(f"Unknown container resource type: {resource_type}")
+        targets = [container_id for container_id, _ in candidates]
+    selected = set(targets)
+
+    def resolve(ref: str) -> str:
+        container_id = aliases.get(ref) or _match_reference(candidates, ref)
+        if container_id not in selected:
+            raise ValueError(
+                f"depends_on refers to {ref}, which is not one of the selected containers"
+            )
+        return container_id
+
+    depends_on: dict[str, list[str]] = {}
+    for container, dependencies in (args.depends_on or {}).items():
+        depends_on.setdefault(resolve(container), []).extend(
+            resolve(dependency) for dependency in dependencies
+        )
+    return targets, depends_on, names
 
 
-@app.list_tools()
-async def list_tools() -> list[types.Tool]:
+def _with_names(
+    results: list[dict[str, Any]], names: dict[str, str]
+) -> list[dict[str, Any]]:
+    """Add the names of the containers to the results of a bulk tool."""
     return [
-        types.Tool(
+        {**result, "name": names[result["container"]]}
+        if result["container"] in names
+        else result
+        for result in results
+    ]
+
+
+def _start_containers_tool(args: BulkContainerActionInput) -> Any:
+    host = _hosts.get(args.host)
+    targets, depends_on, names = _bulk_targets(host, args)
+
+    def start(container_id: str) -> str:
+        host.client.api.start(container_id)
+        host.inventory.invalidate("container", container_id)
+        return "started"
+
+    results = run_ordered(
+        targets,
+        start,
+        depends_on=depends_on,
+        max_parallel=_server_settings.bulk_max_parallel,
+    )
+    return _with_names(results, names)
+
+
+def _stop_containers_tool(args: BulkStopContainersInput) -> Any:
+    host = _hosts.get(args.host)
+    targets, depends_on, names = _bulk_targets(host, args)
+
+    def stop(container_id: str) -> str:
+        host.client.api.stop(container_id, timeout=args.timeout)
+        host.inventory.invalidate("container", container_id)
+        return "stopped"
+
+    results = run_ordered(
+        targets,
+        stop,
+        depends_on=depends_on,
+        reverse=True,
+        max_parallel=_server_settings.bulk_max_parallel,
+    )
+    return _with_names(results, names)
+
+
+def _remove_containers_tool(args: BulkRemoveContainersInput) -> Any:
+    host = _hosts.get(args.host)
+    targets, depends_on, names = _bulk_targets(host, args)
+
+    def remove(container_id: str) -> str:
+        host.client.api.remove_container(container_id, force=args.force)
+        host.inventory.invalidate("container", container_id)
+        return "removed"
+
+    results = run_ordered(
+        targets,
+        remove,
+        depends_on=depends_on,
+        reverse=True,
+        max_parallel=_server_settings.bulk_max_parallel,
+    )
+    return _with_names(results, names)
+
+
+def _fetch_container_logs_tool(args: FetchContainerLogsInput) -> Any:
+    host = _hosts.get(args.host)
+    container = host.client.containers.get(args.container_id)
+    logs, position = fetch_logs(
+        container,
+        tail=args.tail,
+        since=args.since,
+        until=args.until,
+        stdout=args.stdout,
+        stderr=args.stderr,
+        grep=args.grep,
+        max_lines=args.max_lines,
+        max_bytes=args.max_bytes,
+        after=_log_cursors.get(args.cursor) if args.cursor else None,
+    )
+    return {"logs": logs, "cursor": _log_cursors.issue(position)}
+
+
+def _exec_in_container_tool(args: ExecInContainerInput) -> Any:
+    host = _hosts.get(args.host)
+    reporter = current_progress()
+
+    def on_progress(received: int, line: str, final: bool):
+        if reporter is not None:
+            reporter.report(received, None, line, final=final)
+
+    return exec_in_container(
+        host.client,
+        args.container_id,
+        args.command,
+        on_progress=on_progress,
+        max_bytes=args.max_bytes,
+        timeout=args.timeout,
+        **args.model_dump(exclude={"container_id", "command"}, exclude_none=True),
+    )
+
+
+def _list_images_tool(args: ListImagesInput) -> Any:
+    to_dict = docker_to_summary_dict if args.detail == "summary" else docker_to_dict
+
+    def render(
+        host: DockerHost, summaries: list[dict[str, Any]]
+    ) -> list[dict[str, Any]]:
+        return [to_dict(host.client.images.prepare_model(s)) for s in summaries]
+
+    # `images.list()` inspects every image, whereas the summaries from the
+    # list endpoint have everything we serialize
+    return _list_objects(
+        args,
+        lambda host: _list_images(host, **args.model_dump()),
+        lambda summary: summary["Id"],
+        render,
+    )
+
+
+def _pull_image_tool(args: PullPushImageInput) -> Any:
+    host = _hosts.get(args.host)
+    reporter = current_progress()
+    reference = f"{args.repository}:{args.tag}" if args.tag else args.repository
+
+    def on_progress(done: float, message: str):
+        if reporter is not None:
+            reporter.report(done, 1, message)
+
+    try:
+        image = host.pulls.pull(reference, on_progress)
+    finally:
+        host.inventory.invalidate("image")
+    return docker_to_dict(image)
+
+
+def _pull_images_tool(args: PullImagesInput) -> Any:
+    host = _hosts.get(args.host)
+    reporter = current_progress()
+    # Pull each image once, however it's referred to
+    unique: dict[str, str] = {}
+    for reference in args.references:
+        unique.setdefault(canonical_reference(reference), reference)
+    references = list(unique.values())
+    # Overall progress is the sum of the fractions of the pulls done
+    done = dict.fromkeys(references, 0.0)
+    lock = threading.Lock()
+
+    @in_context
+    def pull(reference: str) -> dict[str, Any]:
+        def on_progress(fraction: float, message: str):
+            with lock:
+                done[reference] = fraction
+                progress = sum(done.values())
+            if reporter is not None:
+                reporter.report(progress, len(references), f"{reference}: {message}")
+
+        try:
+            image = host.pulls.pull(reference, on_progress)
+            result = {"reference": reference, "id": image.id, "tags": image.tags}
+        except (DockerException, RequestException) as e:
+            result = {"reference": reference, "error": str(e)}
+        on_progress(1.0, "done" if "id" in result else "failed")
+        return result
+
+    workers = min(_server_settings.pull_max_parallel, len(references))
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            return list(pool.map(pull, references))
+    finally:
+        host.inventory.invalidate("image")
+
+
+def _push_image_tool(args: PullPushImageInput) -> Any:
+    host = _hosts.get(args.host)
+    model_dump = args.model_dump()
+    repository = model_dump.pop("repository")
+    host.client.images.push(repository, **model_dump)
+    return {
+        "status": "pushed",
+        "repository": args.repository,
+        "tag": args.tag,
+    }
+
+
+def _build_image_tool(args: BuildImageInput) -> Any:
+    host = _hosts.get(args.host)
+    reporter = current_progress()
+    context = prepare_context(
+        args.path, args.dockerfile, _server_settings.build_max_context_size
+    )
+
+    def on_progress(step: int, steps: int | None, line: str):
+        if reporter is not None:
+            reporter.report(step, steps, line)
+
+    try:
+        image, logs = build_image(
+            host.client,
+            context,
+            on_progress=on_progress,
+            log_tail=args.log_tail,
+            **args.model_dump(exclude={"dockerfile"}),
+        )
+    finally:
+        if context.archive is not None:
+            context.archive.close()
+        host.inventory.invalidate("image")
+    return {
+        "image": docker_to_dict(image),
+        "context": {"files": context.files, "bytes": context.size},
+        "logs": logs,
+    }
+
+
+def _remove_image_tool(args: RemoveImageInput) -> Any:
+    host = _hosts.get(args.host)
+    host.client.images.remove(**args.model_dump())
+    host.inventory.invalidate("image")
+    return {"status": "removed", "image": args.image}
+
+
+def _list_networks_tool(args: ListNetworksInput) -> Any:
+    to_dict = docker_to_summary_dict if args.detail == "summary" else docker_to_dict
+    return _list_objects(
+        args,
+        lambda host: _list_networks(host, **args.model_dump()),
+        lambda net: net.id,
+        lambda host, networks: [to_dict(net) for net in networks],
+    )
+
+
+def _create_network_tool(args: CreateNetworkInput) -> Any:
+    host = _hosts.get(args.host)
+    network = host.client.networks.create(**args.model_dump())
+    host.inventory.invalidate("network")
+    return docker_to_dict(network)
+
+
+def _remove_network_tool(args: RemoveNetworkInput) -> Any:
+    host = _hosts.get(args.host)
+    network = host.client.networks.get(args.network_id)
+    network.remove()
+    host.inventory.invalidate("network")
+    return docker_to_dict(network)
+
+
+def _list_volumes_tool(args: ListVolumesInput) -> Any:
+    to_dict = docker_to_summary_dict if args.detail == "summary" else docker_to_dict
+    return _list_objects(
+        args,
+        _list_volumes,
+        lambda v: v.name,
+        lambda host, volumes: [to_dict(v) for v in volumes],
+    )
+
+
+def _create_volume_tool(args: CreateVolumeInput) -> Any:
+    host = _hosts.get(args.host)
+    volume = host.client.volumes.create(**args.model_dump())
+    host.inventory.invalidate("volume")
+    return docker_to_dict(volume)
+
+
+def _remove_volume_tool(args: RemoveVolumeInput) -> Any:
+    host = _hosts.get(args.host)
+    volume = host.client.volumes.get(args.volume_name)
+    volume.remove(force=args.force)
+    host.inventory.invalidate("volume")
+    return docker_to_dict(volume)
+
+
+def _apply_project_tool(args: ApplyProjectInput) -> Any:
+    host = _hosts.get(args.host)
+    project_label = f"{PROJECT_LABEL}={args.project}"
+    containers = _inspect_containers(
+        host, _list_containers(host, all=True, filters={"label": project_label})
+    )
+    steps = plan_project(
+        host.client,
+        args.project,
+        [container.model_dump() for container in args.containers],
+        [network.model_dump() for network in args.networks],
+        [volume.model_dump() for volume in args.volumes],
+        {c.name: c.depends_on for c in args.containers if c.depends_on},
+        containers,
+        _list_networks(host, filters={"label": project_label}),
+        _list_volumes(host, filters={"label": project_label}),
+        remove_orphans=args.remove_orphans,
+        max_parallel=_server_settings.bulk_max_parallel,
+    )
+    if args.dry_run:
+        return {
+            "project": args.project,
+            "applied": False,
+            "steps": [describe_step(step) for step in steps],
+        }
+
+    try:
+        results = apply_plan(
+            host.client,
+            host.pulls,
+            steps,
+            max_parallel=_server_settings.bulk_max_parallel,
+        )
+    finally:
+        host.inventory.invalidate()
+    return {
+        "project": args.project,
+        "applied": True,
+        "steps": [describe_step(step, results.get(step.key)) for step in steps],
+    }
+
+
+_tools = ToolRegistry(
+    [
+        ToolSpec(
             name="list_containers",
             description="List all Docker containers",
-            inputSchema=ListContainersInput.model_json_schema(),
+            input_model=ListContainersInput,
+            handler=_list_containers_tool,
+        ),
+        ToolSpec(
+            name="list_container_stats",
+            description="Get CPU, memory, network and block IO usage for all containers matching a filter",
+            input_model=ListContainerStatsInput,
+            handler=_list_container_stats_tool,
         ),
-        types.Tool(
+        ToolSpec(
             name="create_container",
             description="Create a new Docker container",
-            inputSchema=CreateContainerInput.model_json_schema(),
+            input_model=CreateContainerInput,
+            handler=_create_container_tool,
         ),
-        types.Tool(
+        ToolSpec(
             name="run_container",
             description="Run an image in a new Docker container (preferred over `create_container` + `start_container`)",
-            inputSchema=CreateContainerInput.model_json_schema(),
+            input_model=CreateContainerInput,
+            handler=_run_container_tool,
         ),
-        types.Tool(
+        ToolSpec(
             name="recreate_container",
-            description="Stop and remove a container, then run a new container. Fails if the container does not exist.",
-            inputSchema=RecreateContainerInput.model_json_schema(),
+            description="Replace a container by a new one with the given configuration, with minimal downtime: the image is pulled and the new container created before the old one is stopped. Does nothing if the configuration is unchanged. Fails if the container does not exist.",
+            input_model=RecreateContainerInput,
+            handler=_recreate_container_tool,
         ),
-        types.Tool(
+        ToolSpec(
             name="start_container",
             description="Start a Docker container",
-            inputSchema=ContainerActionInput.model_json_schema(),
+            input_model=ContainerActionInput,
+            handler=_start_container_tool,
         ),
-        types.Tool(
+        ToolSpec(
             name="fetch_container_logs",
             description="Fetch logs for a Docker container",
-            inputSchema=FetchContainerLogsInput.model_json_schema(),
+            input_model=FetchContainerLogsInput,
+            handler=_fetch_container_logs_tool,
         ),
-        types.Tool(
+        ToolSpec(
+            name="exec_in_container",
+            description="Run a command in a running Docker container, like `docker exec`, and return its exit code, stdout and stderr. Much faster than running a new container to inspect one. Reports the output received as progress",
+            input_model=ExecInContainerInput,
+            handler=_exec_in_container_tool,
+        ),
+        ToolSpec(
             name="stop_container",
             description="Stop a Docker container",
-            inputSchema=ContainerActionInput.model_json_schema(),
+            input_model=ContainerActionInput,
+            handler=_stop_container_tool,
         ),
-        types.Tool(
+        ToolSpec(
             name="remove_container",
             description="Remove a Docker container",
-            inputSchema=RemoveContainerInput.model_json_schema(),
+            input_model=RemoveContainerInput,
+            handler=_remove_container_tool,
+        ),
+        ToolSpec(
+            name="start_containers",
+            description="Start many Docker containers in parallel, selected by ID or by filters, optionally after their dependencies",
+            input_model=BulkContainerActionInput,
+            handler=_start_containers_tool,
         ),
-        types.Tool(
+        ToolSpec(
+            name="stop_containers",
+            description="Stop many Docker containers in parallel, selected by ID or by filters, optionally before their dependencies",
+            input_model=BulkStopContainersInput,
+            handler=_stop_containers_tool,
+        ),
+        ToolSpec(
+            name="remove_containers",
+            description="Remove many Docker containers in parallel, selected by ID or by filters, optionally before their dependencies",
+            input_model=BulkRemoveContainersInput,
+            handler=_remove_containers_tool,
+        ),
+        ToolSpec(
             name="list_images",
             description="List Docker images",
-            inputSchema=ListImagesInput.model_json_schema(),
+            input_model=ListImagesInput,
+            handler=_list_images_tool,
         ),
-        types.Tool(
+        ToolSpec(
             name="pull_image",
             description="Pull a Docker image",
-            inputSchema=PullPushImageInput.model_json_schema(),
+            input_model=PullPushImageInput,
+            handler=_pull_image_tool,
         ),
-        types.Tool(
+        ToolSpec(
+            name="pull_images",
+            description="Pull several Docker images concurrently. Pulls of an image already being pulled are combined. Returns the ID and tags of each image, or the error pulling it",
+            input_model=PullImagesInput,
+            handler=_pull_images_tool,
+        ),
+        ToolSpec(
             name="push_image",
             description="Push a Docker image",
-            inputSchema=PullPushImageInput.model_json_schema(),
+            input_model=PullPushImageInput,
+            handler=_push_image_tool,
         ),
-        types.Tool(
+        ToolSpec(
             name="build_image",
-            description="Build a Docker image from a Dockerfile",
-            inputSchema=BuildImageInput.model_json_schema(),
+            description="Build a Docker image from a Dockerfile. The build output is streamed as progress notifications, and its last lines returned",
+            input_model=BuildImageInput,
+            handler=_build_image_tool,
         ),
-        types.Tool(
+        ToolSpec(
             name="remove_image",
             description="Remove a Docker image",
-            inputSchema=RemoveImageInput.model_json_schema(),
+            input_model=RemoveImageInput,
+            handler=_remove_image_tool,
         ),
-        types.Tool(
+        ToolSpec(
             name="list_networks",
             description="List Docker networks",
-            inputSchema=ListNetworksInput.model_json_schema(),
+            input_model=ListNetworksInput,
+            handler=_list_networks_tool,
         ),
-        types.Tool(
+        ToolSpec(
             name="create_network",
             description="Create a Docker network",
-            inputSchema=CreateNetworkInput.model_json_schema(),
+            input_model=CreateNetworkInput,
+            handler=_create_network_tool,
         ),
-        types.Tool(
+        ToolSpec(
             name="remove_network",
             description="Remove a Docker network",
-            inputSchema=RemoveNetworkInput.model_json_schema(),
+            input_model=RemoveNetworkInput,
+            handler=_remove_network_tool,
         ),
-        types.Tool(
+        ToolSpec(
             name="list_volumes",
             description="List Docker volumes",
-            inputSchema=ListVolumesInput.model_json_schema(),
+            input_model=ListVolumesInput,
+            handler=_list_volumes_tool,
         ),
-        types.Tool(
+        ToolSpec(
             name="create_volume",
             description="Create a Docker volume",
-            inputSchema=CreateVolumeInput.model_json_schema(),
+            input_model=CreateVolumeInput,
+            handler=_create_volume_tool,
         ),
-        types.Tool(
+        ToolSpec(
             name="remove_volume",
             description="Remove a Docker volume",
-            inputSchema=RemoveVolumeInput.model_json_schema(),
+            input_model=RemoveVolumeInput,
+            handler=_remove_volume_tool,
+        ),
+        ToolSpec(
+            name="apply_project",
+            description="Bring a project's containers, networks and volumes to the desired state in one call, like `docker compose up`: creates what is missing, recreates containers whose configuration changed, and optionally removes orphans. Independent steps run in parallel, in dependency order. Use `dry_run` to get the plan without applying it.",
+            input_model=ApplyProjectInput,
+            handler=_apply_project_tool,
         ),
     ]
+)
 
 
-@app.call_tool()
-async def call_tool(
-    name: str, arguments: Any
-) -> Sequence[types.TextContent | types.ImageContent | types.EmbeddedResource]:
-    if arguments is None:
-        arguments = {}
-
-    result = None
-
-    try:
-        if name == "list_containers":
-            args = ListContainersInput(**arguments)
-            containers = _docker.containers.list(**args.model_dump())
-            result = [docker_to_dict(c) for c in containers]
-
-        elif name == "create_container":
-            args = CreateContainerInput(**arguments)
-            container = _docker.containers.create(**args.model_dump())
-            result = docker_to_dict(container)
-
-        elif name == "run_container":
-            args = CreateContainerInput(**arguments)
-            container = _docker.containers.run(**args.model_dump())
-            result = docker_to_dict(container)
-
-        elif name == "recreate_container":
-            args = RecreateContainerInput(**arguments)
-
-            container = _docker.containers.get(args.resolved_container_id)
-            container.stop()
-            container.remove()
-
-            run_args = CreateContainerInput(**arguments)
-            container = _docker.containers.run(**run_args.model_dump())
-            result = docker_to_dict(container)
-
-        elif name == "start_container":
-            args = ContainerActionInput(**arguments)
-            container = _docker.containers.get(args.container_id)
-            container.start()
-            result = docker_to_dict(container)
-
-        elif name == "stop_container":
-            args = ContainerActionInput(**arguments)
-            container = _docker.containers.get(args.container_id)
-            container.stop()
-            result = docker_to_dict(container)
-
-        elif name == "remove_container":
-            args = RemoveContainerInput(**arguments)
-            container = _docker.containers.get(args.container_id)
-            container.remove(force=args.force)
-            result = docker_to_dict(container, {"status": "removed"})
-
-        elif name == "fetch_container_logs":
-            args = FetchContainerLogsInput(**arguments)
-            container = _docker.containers.get(args.container_id)
-            logs = container.logs(tail=args.tail).decode("utf-8")
-            result = {"logs": logs.split("\n")}
-
-        elif name == "list_images":
-            args = ListImagesInput(**arguments)
-
-            images = _docker.images.list(**args.model_dump())
-            result = [docker_to_dict(img) for img in images]
-
-        elif name == "pull_image":
-            args = PullPushImageInput(**arguments)
-            model_dump = args.model_dump()
-            repository = model_dump.pop("repository")
-            image = _docker.images.pull(repository, **model_dump)
-            result = docker_to_dict(image)
-
-        elif name == "push_image":
-            args = PullPushImageInput(**arguments)
-            model_dump = args.model_dump()
-            repository = model_dump.pop("repository")
-            _docker.images.push(repository, **model_dump)
-            result = {
-                "status": "pushed",
-                "repository": args.repository,
-                "tag": args.tag,
-            }
-
-        elif name == "build_image":
-            args = BuildImageInput(**arguments)
-            image, logs = _docker.images.build(**args.model_dump())
-            result = {"image": docker_to_dict(image), "logs": list(logs)}
-
-        elif name == "remove_image":
-            args = RemoveImageInput(**arguments)
-            _docker.images.remove(**args.model_dump())
-            result = {"status": "removed", "image": args.image}
-
-        elif name == "list_networks":
-            args = ListNetworksInput(**arguments)
-            networks = _docker.networks.list(**args.model_dump())
-            result = [docker_to_dict(net) for net in networks]
-
-        elif name == "create_network":
-            args = CreateNetworkInput(**arguments)
-            network = _docker.networks.create(**args.model_dump())
-            result = docker_to_dict(network)
-
-        elif name == "remove_network":
-            args = RemoveNetworkInput(**arguments)
-            network = _docker.networks.get(args.network_id)
-            network.remove()
-            result = docker_to_dict(network)
-
-        elif name == "list_volumes":
-            ListVolumesInput(**arguments)  # Validate empty input
-            volumes = _docker.volumes.list()
-            result = [docker_to_dict(v) for v in volumes]
-
-        elif name == "create_volume":
-            args = CreateVolumeInput(**arguments)
-            volume = _docker.volumes.create(**args.model_dump())
-            result = docker_to_dict(volume)
-
-        elif name == "remove_volume":
-            args = RemoveVolumeInput(**arguments)
-            volume = _docker.volumes.get(args.volume_name)
-            volume.remove(force=args.force)
-            result = docker_to_dict(volume)
-
-        else:
-            return [types.TextContent(type="text", text=f"Unknown tool: {name}")]
-
-    except ValidationError as e:
-        await app.request_context.session.send_log_message(
-            "error", "Failed to validate input provided by LLM: " + str(e)
-        )
-        return [
-            types.TextContent(
-                type="text", text=f"ERROR: You provided invalid Tool inputs: {e}"
-            )
-        ]
-
-    except Exception as e:
-        await app.request_context.session.send_log_message(
-            "error", traceback.format_exc()
-        )
-        raise e
-
-    return [types.TextContent(type="text", text=json.dumps(result, indent=2))]
-
-
-async def run_stdio(settings: ServerSettings, docker_client: docker.DockerClient):
-    """Run the server on Standard I/O with the given settings and Docker client."""
-    from mcp.server.stdio import stdio_server
-
-    global _docker
-    _docker = docker_client
+@contextlib.contextmanager
+def _serving(settings: ServerSettings, docker_client: docker.DockerClient | None):
+    """
+    Set up the state shared by every session: the Docker hosts with their
+    caches and background streams, and the executor for blocking calls. Tears it
+    down on exit.
+    """
+    global _hosts
+    _hosts = DockerHosts.from_settings(settings, docker_client)
 
     global _server_settings
     _server_settings = settings
 
-    async with stdio_server() as (read_stream, write_stream):
-        await app.run(read_stream, write_stream, app.create_initialization_options())
+    global _executor
+    _executor = ThreadPoolExecutor(
+        max_workers=settings.docker_max_workers, thread_name_prefix="docker"
+    )
+
+    global _log_cursors
+    _log_cursors = LogCursors(settings.log_cursor_capacity)
+
+    try:
+        yield
+    finally:
+        _hosts.close()
+        _executor.shutdown(wait=False, cancel_futures=True)
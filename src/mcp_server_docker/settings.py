@@ -1,5 +1,125 @@
+from typing import Literal
+
+from pydantic import BaseModel, Field
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
+from .encoding import ResponseFormat
+
+
+class DockerHostSettings(BaseModel):
+    base_url: str = Field(
+        ...,
+        description="URL of the Docker daemon, e.g. `ssh://user@host`, `tcp://host:2375` or `unix:///var/run/docker.sock`",
+    )
+    max_pool_size: int | None = Field(
+        None,
+        ge=1,
+        description="Maximum number of connections kept open to the daemon. Defaults to `docker_max_workers`",
+    )
+    use_ssh_client: bool = Field(
+        False,
+        description="Connect over `ssh://` with the `ssh` command rather than Paramiko, honoring `~/.ssh/config`",
+    )
+
 
 class ServerSettings(BaseSettings):
     model_config = SettingsConfigDict(env_prefix="mcp_server_")
+
+    transport: Literal["stdio", "streamable-http", "sse"] = Field(
+        "stdio",
+        description="How clients connect: over Standard I/O, or over HTTP with the Streamable HTTP or SSE transport",
+    )
+    http_host: str = Field(
+        "127.0.0.1", description="Address to listen on with an HTTP transport"
+    )
+    http_port: int = Field(
+        8000, ge=0, le=65535, description="Port to listen on with an HTTP transport"
+    )
+    metrics_port: int | None = Field(
+        None,
+        ge=0,
+        le=65535,
+        description="Port to serve metrics on for Prometheus, at `/metrics` on `http_host`, whatever the transport. Not served if unset",
+    )
+
+    docker_hosts: dict[str, DockerHostSettings] = Field(
+        default_factory=dict,
+        description="Docker hosts to manage, by name. If empty, a single host named `default` is configured from the environment like the Docker CLI",
+    )
+    default_host: str | None = Field(
+        None,
+        description="Name of the host used when a tool call doesn't name one. Defaults to the first of `docker_hosts`",
+    )
+    host_health_interval: float = Field(
+        30,
+        ge=0,
+        description="Seconds after which a host is pinged again before use, to report an unreachable host up front. A host that failed fails fast for as long",
+    )
+    docker_max_workers: int = Field(
+        8,
+        ge=1,
+        description="Maximum number of blocking Docker SDK calls running concurrently",
+    )
+    bulk_max_parallel: int = Field(
+        16,
+        ge=1,
+        description="Maximum number of containers acted on concurrently by the bulk container tools, e.g. `stop_containers`",
+    )
+    pull_max_parallel: int = Field(
+        4,
+        ge=1,
+        description="Maximum number of images pulled concurrently by `pull_images`",
+    )
+    build_max_context_size: int | None = Field(
+        1024**3,
+        ge=1,
+        description="Maximum size in bytes of the files sent as a build context, after `.dockerignore`. Checked before archiving them. No limit if unset",
+    )
+    default_timeout: float | None = Field(
+        None,
+        gt=0,
+        description="Timeout in seconds for a tool call, resource read or prompt. No timeout if unset",
+    )
+    tool_timeouts: dict[str, float] = Field(
+        default_factory=dict,
+        description="Per-tool timeouts in seconds, keyed by tool name. Overrides `default_timeout`",
+    )
+    cache_ttl: float = Field(
+        30,
+        ge=0,
+        description="Seconds to cache listings of Docker objects for, on top of invalidation by Docker events. 0 disables the cache",
+    )
+    log_cursor_capacity: int = Field(
+        1024,
+        ge=1,
+        description="Maximum number of log cursors kept for `fetch_container_logs`, evicting the least recently used",
+    )
+    resource_page_size: int = Field(
+        100,
+        ge=1,
+        description="Number of containers whose logs and stats resources are listed per page of `resources/list`",
+    )
+    prompt_snapshot_max_bytes: int = Field(
+        16384,
+        ge=1024,
+        description="Maximum size in bytes of the project's current resources embedded in the `docker_compose` prompt. The objects over it are summarized",
+    )
+    subscription_min_interval: float = Field(
+        1.0,
+        ge=0,
+        description="Minimum seconds between two update notifications for a subscribed resource",
+    )
+    stats_window: int = Field(
+        10,
+        ge=2,
+        description="Number of stats samples (about one per second) kept per container to compute rates",
+    )
+    stats_idle_timeout: float = Field(
+        300,
+        gt=0,
+        description="Seconds after which stats collection stops for a container whose stats aren't read",
+    )
+    response_format: ResponseFormat = Field(
+        "json",
+        description="Encoding of tool results and resources: compact `json`, indented `pretty` JSON, or `table` to send lists of objects as columns and rows. List tools can override it per call",
+    )
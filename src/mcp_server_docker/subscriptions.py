@@ -0,0 +1,163 @@
+import asyncio
+import logging
+import threading
+from collections.abc import Callable, Iterable
+
+import anyio
+import docker
+from docker.errors import NotFound
+from docker.types import CancellableStream
+from mcp.server.session import ServerSession
+from pydantic import AnyUrl
+
+from .stats import StatsCollector
+
+logger = logging.getLogger(__name__)
+
+
+class _Watcher:
+    """
+    Reads one Docker stream in a background thread for a resource, and notifies
+    the subscribed sessions that the resource changed.
+
+    Changes are coalesced: sessions get at most one notification per
+    `min_interval` seconds, however many items the stream produced meanwhile.
+    """
+
+    def __init__(
+        self,
+        uri: str,
+        open_stream: Callable[[], Iterable],
+        min_interval: float,
+        on_idle: Callable[[], None],
+    ):
+        self.uri = uri
+        self.sessions: set[ServerSession] = set()
+        self._open_stream = open_stream
+        self._min_interval = min_interval
+        self._on_idle = on_idle
+        self._changed = asyncio.Event()
+        self._stopped = threading.Event()
+        self._stream: Iterable | None = None
+        self._notifier: asyncio.Task | None = None
+
+    def start(self):
+        loop = asyncio.get_running_loop()
+        threading.Thread(
+            target=self._read, args=(loop,), name=f"watch {self.uri}", daemon=True
+        ).start()
+        self._notifier = loop.create_task(self._notify())
+
+    def stop(self):
+        self._stopped.set()
+        stream = self._stream
+        # Log streams can be closed from another thread, whereas following
+        # stats ends at the next sample (about every second)
+        if isinstance(stream, CancellableStream):
+            stream.close()
+        if self._notifier is not None:
+            self._notifier.cancel()
+
+    def _read(self, loop: asyncio.AbstractEventLoop):
+        backoff = 1.0
+        while not self._stopped.is_set():
+            try:
+                self._stream = self._open_stream()
+                for _ in self._stream:
+                    if self._stopped.is_set():
+                        return
+                    loop.call_soon_threadsafe(self._changed.set)
+                    backoff = 1.0
+            except NotFound:
+                logger.info(f"Stopped watching {self.uri}: container not found")
+                return
+            except Exception:
+                if not self._stopped.is_set():
+                    logger.warning(f"Failed to watch {self.uri}", exc_info=True)
+            finally:
+                self._stream = None
+
+            # The stream ended, e.g. because the container stopped: retry
+            # until it runs again or nobody is subscribed anymore
+            if self._stopped.wait(backoff):
+                return
+            backoff = min(backoff * 2, 30.0)
+
+    async def _notify(self):
+        while True:
+            await self._changed.wait()
+            self._changed.clear()
+
+            for session in list(self.sessions):
+                try:
+                    await session.send_resource_updated(AnyUrl(self.uri))
+                except (anyio.ClosedResourceError, anyio.BrokenResourceError):
+                    # The session is gone
+                    self.sessions.discard(session)
+
+            if not self.sessions:
+                self._on_idle()
+                return
+
+            await asyncio.sleep(self._min_interval)
+
+
+class ResourceSubscriptions:
+    """
+    Sessions subscribed to the live `logs` and `stats` container resources.
+
+    There is at most one Docker stream per resource, shared by all of its
+    subscribers, and it's closed once the last subscriber leaves.
+    """
+
+    def __init__(
+        self, client: docker.DockerClient, stats: StatsCollector, min_interval: float
+    ):
+        self._client = client
+        self._stats = stats
+        self._min_interval = min_interval
+        self._watchers: dict[str, _Watcher] = {}
+
+    def subscribe(
+        self, uri: str, container_id: str, resource_type: str, session: ServerSession
+    ):
+        watcher = self._watchers.get(uri)
+        if watcher is None:
+            watcher = _Watcher(
+                uri,
+                self._stream_opener(container_id, resource_type),
+                self._min_interval,
+                on_idle=lambda: self._drop(uri),
+            )
+            self._watchers[uri] = watcher
+            watcher.start()
+        watcher.sessions.add(session)
+
+    def unsubscribe(self, uri: str, session: ServerSession):
+        watcher = self._watchers.get(uri)
+        if watcher is None:
+            return
+        watcher.sessions.discard(session)
+        if not watcher.sessions:
+            self._drop(uri)
+
+    def close(self):
+        for watcher in self._watchers.values():
+            watcher.stop()
+        self._watchers.clear()
+
+    def _drop(self, uri: str):
+        watcher = self._watchers.pop(uri, None)
+        if watcher is not None:
+            watcher.stop()
+
+    def _stream_opener(
+        self, container_id: str, resource_type: str
+    ) -> Callable[[], Iterable]:
+        if resource_type == "logs":
+            # Only lines logged from now on
+            return lambda: self._client.api.logs(
+                container_id, stream=True, follow=True, tail=0
+            )
+        # Share the stream that the stats collector reads anyway
+        return lambda: self._stats.follow(container_id)
@@ -0,0 +1,58 @@
+import functools
+from collections.abc import Callable, Iterable
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Any
+
+from mcp import types
+from pydantic import BaseModel
+
+
+@dataclass(frozen=True)
+class ToolSpec:
+    name: str
+    description: str
+    input_model: type[BaseModel]
+    # Makes the (blocking) Docker SDK calls given the validated inputs, and
+    # returns a JSON-serializable result
+    handler: Callable[[Any], Any]
+
+
+class ToolRegistry:
+    """
+    Immutable table of the tools served, looked up by name.
+
+    The MCP definitions of the tools, with their JSON schemas, are generated
+    once on first use, and each schema once per input model even when several
+    tools share it. The server lists the tools from the precomputed manifest
+    instead (see `manifest`), so they're only generated to write it.
+    """
+
+    def __init__(self, specs: Iterable[ToolSpec]):
+        specs = list(specs)
+        self._specs = MappingProxyType({spec.name: spec for spec in specs})
+        if len(self._specs) != len(specs):
+            raise ValueError("Duplicate tool names")
+
+    def get(self, name: str) -> ToolSpec | None:
+        return self._specs.get(name)
+
+    @functools.cached_property
+    def _definitions(self) -> tuple[types.Tool, ...]:
+        schemas: dict[type[BaseModel], dict[str, Any]] = {}
+        definitions = []
+        for spec in self._specs.values():
+            if spec.input_model not in schemas:
+                schemas[spec.input_model] = spec.input_model.model_json_schema()
+            definitions.append(
+                types.Tool(
+                    name=spec.name,
+                    description=spec.description,
+                    inputSchema=schemas[spec.input_model],
+                )
+            )
+        return tuple(definitions)
+
+    @property
+    def definitions(self) -> list[types.Tool]:
+        return list(self._definitions)